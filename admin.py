@@ -591,12 +591,16 @@ class AdminPanel:
                     bg=self.colors['secondary']
                 ).pack(pady=(0, 20))
                 
+                # Raw BLOB hashes and salts are shown as hex
+                password_hash = user[2].hex() if isinstance(user[2], bytes) else user[2]
+                salt = user[3].hex() if isinstance(user[3], bytes) else user[3]
+                
                 # Details
                 details = [
                     ("Role:", user[1].title()),
                     ("Created:", user[4] if user[4] else "Unknown"),
-                    ("Password Hash:", user[2]),
-                    ("Salt:", user[3] if user[3] else "No Salt")
+                    ("Password Hash:", password_hash),
+                    ("Salt:", salt if salt else "No Salt")
                 ]
                 
                 for label, value in details:
@@ -789,22 +793,20 @@ class AdminPanel:
                 conn = sqlite3.connect(self.db_path)
                 cursor = conn.cursor()
                 
-                # Check if user exists
-                cursor.execute('SELECT username FROM users WHERE username = ?', (username,))
-                if cursor.fetchone():
+                # Create user with a raw salt and digest (stored as BLOBs) -
+                # the UNIQUE username constraint rejects duplicates
+                salt = secrets.token_bytes(16)
+                password_hash = hashlib.sha256(password.encode('utf-8') + salt).digest()
+                try:
+                    cursor.execute('''
+                        INSERT INTO users (username, password, salt, role) 
+                        VALUES (?, ?, ?, ?)
+                    ''', (username, password_hash, salt, role))
+                except sqlite3.IntegrityError:
                     messagebox.showerror("Error", "Username already exists!")
                     conn.close()
                     return
                 
-                # Create user with salt
-                salt = secrets.token_hex(32)
-                salted_password = password + salt
-                password_hash = hashlib.sha256(salted_password.encode('utf-8')).hexdigest()
-                cursor.execute('''
-                    INSERT INTO users (username, password, salt, role) 
-                    VALUES (?, ?, ?, ?)
-                ''', (username, password_hash, salt, role))
-                
                 conn.commit()
                 conn.close()
                 
@@ -904,9 +906,8 @@ class AdminPanel:
                 cursor = conn.cursor()
                 
                 # Generate new salt and hash
-                salt = secrets.token_hex(32)
-                salted_password = new_password + salt
-                password_hash = hashlib.sha256(salted_password.encode('utf-8')).hexdigest()
+                salt = secrets.token_bytes(16)
+                password_hash = hashlib.sha256(new_password.encode('utf-8') + salt).digest()
                 cursor.execute(
                     'UPDATE users SET password = ?, salt = ? WHERE username = ?',
                     (password_hash, salt, username)
@@ -8,28 +8,50 @@ It connects to the mediator server to request help and manage control sessions.
 import socket
 import threading
 import time
-import pickle
-import base64
 import io
+import zlib
 import logging
+import logging.handlers
+import queue
+import atexit
 import sys
-import json
 import pyautogui
 from PIL import Image, ImageGrab
 import tkinter as tk
 from tkinter import messagebox, simpledialog
 from tkinter import ttk
 import ssl_utils
+import protocol_utils
 
-# Setup logging
+# Unchanged screens are spotted by hash; xxhash is far quicker on big raw frames
+try:
+    import xxhash
+    _frame_hash = xxhash.xxh3_64_intdigest
+except ImportError:
+    _frame_hash = zlib.crc32
+
+# mss grabs the screen as a raw BGRA buffer, much faster than ImageGrab
+try:
+    import mss
+    HAVE_MSS = True
+except ImportError:
+    HAVE_MSS = False
+
+# Setup logging - records are only queued by the caller; the file and
+# console writes happen on the listener's own thread
+_log_queue = queue.Queue(-1)
+_log_listener = logging.handlers.QueueListener(
+    _log_queue,
+    logging.FileHandler("client_log.txt"),
+    logging.StreamHandler(sys.stdout)
+)
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("client_log.txt"),
-        logging.StreamHandler(sys.stdout)
-    ]
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
 )
+_log_listener.start()
+atexit.register(_log_listener.stop)  # Flush what is still queued on exit
 logger = logging.getLogger("RemoteControlClient")
 
 # Disable PyAutoGUI fail-safe
@@ -40,7 +62,15 @@ pyautogui.PAUSE = 0  # ADD THIS LINE - remove pause between operations
 REMOTE_CONTROL_PORT = 5555  # Port for direct connection with technician
 MEDIATOR_PORT = 5556       # Port for mediator server
 SCREENSHOT_INTERVAL = 0.1
+RESYNC_FRAMES = 50  # Unchanged frames in a row before the full picture is sent again
 BUFFER_SIZE = 8192
+CONTROL_SNDBUF = 4 << 20  # Kernel send buffer for the screenshot stream
+KEEPALIVE_IDLE = 5  # Idle seconds on the control connection before keepalive probes
+KEEPALIVE_PROBE_INTERVAL = 3
+KEEPALIVE_PROBES = 3
+
+# Fixed reply, encoded once
+HEARTBEAT_RESPONSE_FRAME = protocol_utils.encode_message({'type': 'heartbeat_response'})
 
 class RemoteControlClientWithMediator:
     def __init__(self, username=None):
@@ -49,6 +79,7 @@ class RemoteControlClientWithMediator:
         self.control_running = False
         self.technician_socket = None
         self.technician_address = None
+        self.raw_screenshots = False
         
         # Mediator connection
         self.mediator_socket = None
@@ -56,6 +87,9 @@ class RemoteControlClientWithMediator:
         self.client_id = None
         self.help_requested = False
         self.current_session_id = None
+        self._mediator_buf = bytearray(BUFFER_SIZE)  # Reused for every mediator message
+        
+        self._local_ip = None  # Filled in by the first get_local_ip()
         
         # Store username from login
         self.username = username
@@ -441,29 +475,24 @@ class RemoteControlClientWithMediator:
         return btn
         
     def get_local_ip(self):
-        """Get the local IP address."""
+        """Get the local IP address, looked up once and then cached."""
+        if self._local_ip is not None:
+            return self._local_ip
+            
         try:
             # Connect to a remote server to determine local IP
             with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
                 s.connect(("8.8.8.8", 80))
-                return s.getsockname()[0]
+                self._local_ip = s.getsockname()[0]
+                return self._local_ip
         except Exception:
-            return "127.0.0.1"
+            return "127.0.0.1"  # Not cached, so a later call can still find the network
             
     def log(self, message):
         """Add a message to the log."""
-        timestamp = time.strftime("%H:%M:%S")
-        log_message = f"[{timestamp}] {message}"
+        # There is no log widget any more - console and file only
         logger.info(message)
         
-        # Update GUI log
-        self.root.after(0, lambda: self._update_log_gui(log_message))
-        
-    def _update_log_gui(self, message):
-        """Update the GUI log in the main thread."""
-        # Log widget removed - only console logging now
-        pass
-        
     def connect_to_mediator(self):
         """Connect to the mediator server."""
         if self.mediator_connected:
@@ -494,14 +523,14 @@ class RemoteControlClientWithMediator:
                 'ip': self.get_local_ip()
             }
             
-            self.mediator_socket.send(json.dumps(connect_message).encode('utf-8'))
+            protocol_utils.send_message(self.mediator_socket, connect_message)
             
             # Wait for welcome message
-            response = self.mediator_socket.recv(BUFFER_SIZE)
-            welcome_msg = json.loads(response.decode('utf-8'))
+            welcome_msg = protocol_utils.recv_message(self.mediator_socket, self._mediator_buf)
             
-            if welcome_msg['type'] == 'welcome':
+            if welcome_msg and welcome_msg['type'] == 'welcome':
                 self.client_id = welcome_msg['client_id']
+                ssl_utils.remember_session(self.mediator_socket, mediator_ip, MEDIATOR_PORT)
                 self.mediator_connected = True
                 
                 # Update UI
@@ -558,11 +587,10 @@ class RemoteControlClientWithMediator:
         try:
             while self.mediator_connected and self.mediator_socket:
                 try:
-                    data = self.mediator_socket.recv(BUFFER_SIZE)
-                    if not data:
+                    message = protocol_utils.recv_message(self.mediator_socket, self._mediator_buf)
+                    if message is None:
                         break
                         
-                    message = json.loads(data.decode('utf-8'))
                     self.process_mediator_message(message)
                     
                 except ConnectionError:
@@ -590,9 +618,8 @@ class RemoteControlClientWithMediator:
             
         elif msg_type == 'heartbeat':
             # Respond to heartbeat
-            response = {'type': 'heartbeat_response'}
             try:
-                self.mediator_socket.send(json.dumps(response).encode('utf-8'))
+                self.mediator_socket.sendall(HEARTBEAT_RESPONSE_FRAME)
             except:
                 pass
                 
@@ -623,7 +650,7 @@ class RemoteControlClientWithMediator:
         }
         
         try:
-            self.mediator_socket.send(json.dumps(response).encode('utf-8'))
+            protocol_utils.send_message(self.mediator_socket, response)
             
             if result:
                 self.log(f"Approved control request from {tech_name}")
@@ -643,7 +670,7 @@ class RemoteControlClientWithMediator:
             
         try:
             help_request = {'type': 'help_request'}
-            self.mediator_socket.send(json.dumps(help_request).encode('utf-8'))
+            protocol_utils.send_message(self.mediator_socket, help_request)
             self.help_requested = True
             self.log("Help request sent to mediator server")
             
@@ -658,7 +685,7 @@ class RemoteControlClientWithMediator:
             
         try:
             cancel_request = {'type': 'cancel_help'}
-            self.mediator_socket.send(json.dumps(cancel_request).encode('utf-8'))
+            protocol_utils.send_message(self.mediator_socket, cancel_request)
             self.help_requested = False
             
             # Update UI
@@ -693,7 +720,7 @@ class RemoteControlClientWithMediator:
                         'type': 'end_session',
                         'session_id': self.current_session_id
                     }
-                    self.mediator_socket.send(json.dumps(end_session_msg).encode('utf-8'))
+                    protocol_utils.send_message(self.mediator_socket, end_session_msg)
                 except Exception as e:
                     self.log(f"Error notifying mediator about session end: {str(e)}")
             
@@ -759,8 +786,14 @@ class RemoteControlClientWithMediator:
                         tech_socket.close()
                         continue
                         
+                    # Set the send timeout once rather than per screenshot
+                    tech_socket.settimeout(10.0)
+                    tech_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                    tech_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, CONTROL_SNDBUF)
+                    self._enable_keepalive(tech_socket)
                     self.technician_socket = tech_socket
                     self.technician_address = tech_address
+                    self.raw_screenshots = False  # JPEG until the technician asks for raw
                     
                     self.root.after(0, lambda: self.technician_label.config(
                         text=f"{tech_address[0]}:{tech_address[1]}", fg="green"))
@@ -782,18 +815,31 @@ class RemoteControlClientWithMediator:
             if self.control_running:
                 self.log(f"Error in accept_control_connections: {str(e)}")
                 
+    def _enable_keepalive(self, sock):
+        """Let the kernel probe an idle technician connection so a dead link surfaces as an error."""
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        for option, value in (('TCP_KEEPIDLE', KEEPALIVE_IDLE),
+                              ('TCP_KEEPINTVL', KEEPALIVE_PROBE_INTERVAL),
+                              ('TCP_KEEPCNT', KEEPALIVE_PROBES)):
+            if hasattr(socket, option):  # Not every platform exposes all three
+                sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+                
     def handle_technician(self):
         """Handle commands from the connected technician."""
+        buffer = bytearray(BUFFER_SIZE)
+        
         try:
             while self.control_running and self.technician_socket:
                 try:
-                    data = self.technician_socket.recv(BUFFER_SIZE)
-                    if not data:
+                    # Commands are length-prefixed, one per frame
+                    command = protocol_utils.recv_message(self.technician_socket, buffer)
+                    if command is None:
                         break
                         
-                    command = pickle.loads(data)
                     self.process_command(command)
                     
+                except socket.timeout:
+                    continue  # Idle technician; keepalive catches a dead one
                 except ConnectionError:
                     break
                 except Exception as e:
@@ -837,6 +883,9 @@ class RemoteControlClientWithMediator:
                 # Use typewrite for better text input handling
                 pyautogui.typewrite(text, interval=0.01)
                 
+            elif command_type == 'screen_format':
+                self.raw_screenshots = bool(command.get('raw_rgb'))
+                
             elif command_type == 'ping':
                 # Keep-alive ping, no action needed
                 pass
@@ -848,45 +897,62 @@ class RemoteControlClientWithMediator:
         """Send screenshots to the connected technician with improved error handling."""
         consecutive_failures = 0
         max_failures = 5
+        sct = None
+        sent_key = None  # Identifies the picture the technician is showing
+        unchanged_run = 0
         
         try:
+            if HAVE_MSS:
+                sct = mss.mss()  # mss handles belong to the thread that made them
+                
             while self.control_running and self.technician_socket:
                 try:
-                    # Capture screenshot
-                    screenshot = ImageGrab.grab()
-                    
+                    if self.raw_screenshots and sct is not None:
+                        # The BGRA buffer goes out as captured, PIL never touches it
+                        shot = sct.grab(sct.monitors[1])
+                        fmt = protocol_utils.SCREEN_RAW_BGRA
+                        size = shot.size
+                        img_bytes = picture = shot.raw
+                    else:
+                        # Capture screenshot
+                        screenshot = ImageGrab.grab()
+                        size = screenshot.size
+                        if screenshot.mode != 'RGB':
+                            screenshot = screenshot.convert('RGB')
+                        picture = screenshot.tobytes()
+                        
+                        if self.raw_screenshots:
+                            # Raw pixels cost bandwidth but nothing to encode or decode
+                            fmt = protocol_utils.SCREEN_RAW_RGB
+                            img_bytes = picture
+                        else:
+                            fmt = protocol_utils.SCREEN_JPEG
+                            img_bytes = None  # Encoded below, only if the picture changed
+                            
+                    # A static screen goes out as a header alone; the technician
+                    # keeps showing its last picture and just moves the cursor.
+                    # Every so often the full picture goes anyway, as a resync
+                    frame_key = (_frame_hash(picture), fmt, size)
+                    if frame_key == sent_key and unchanged_run < RESYNC_FRAMES:
+                        fmt, img_bytes = protocol_utils.SCREEN_UNCHANGED, b''
+                        unchanged_run += 1
+                    else:
+                        unchanged_run = 0
+                    if img_bytes is None:
+                        # Convert to bytes with optimized quality
+                        img_byte_arr = io.BytesIO()
+                        screenshot.save(img_byte_arr, format='JPEG', quality=60, optimize=True)
+                        img_bytes = img_byte_arr.getvalue()
+                        
                     # Get cursor position
                     cursor_x, cursor_y = pyautogui.position()
                     
-                    # Convert to bytes with optimized quality
-                    img_byte_arr = io.BytesIO()
-                    screenshot.save(img_byte_arr, format='JPEG', quality=60, optimize=True)
-                    img_bytes = img_byte_arr.getvalue()
+                    # Size, header and pixels go as one write so they share a TLS record
+                    data = protocol_utils.encode_screenshot(
+                        fmt, size, (cursor_x, cursor_y), img_bytes)
                     
-                    # Prepare data packet
-                    data_packet = {
-                        'image': base64.b64encode(img_bytes),
-                        'cursor_x': cursor_x,
-                        'cursor_y': cursor_y
-                    }
-                    
-                    # Serialize and send
-                    data = pickle.dumps(data_packet)
-                    size = len(data)
-                    
-                    # Send size first, then data
-                    size_bytes = size.to_bytes(4, byteorder='big')
-                    
-                    # Set shorter timeout for sending
-                    original_timeout = self.technician_socket.gettimeout()
-                    self.technician_socket.settimeout(10.0)
-                    
-                    self.technician_socket.sendall(size_bytes)
                     self.technician_socket.sendall(data)
-                    
-                    # Restore timeout
-                    if original_timeout:
-                        self.technician_socket.settimeout(original_timeout)
+                    sent_key = frame_key
                     
                     # Reset failure counter on success
                     consecutive_failures = 0
@@ -913,6 +979,8 @@ class RemoteControlClientWithMediator:
         except Exception as e:
             self.log(f"Error in send_screenshots: {str(e)}")
         finally:
+            if sct is not None:
+                sct.close()
             self.disconnect_technician()
             
     def disconnect_technician(self):
@@ -9,7 +9,7 @@ import sys
 import os
 import time
 
-def launch_component(script_name, title, delay=0):
+def launch_component(script_name, title, delay=0, interpreter=None):
     """Launch a system component with optional delay."""
     try:
         if delay > 0:
@@ -21,7 +21,7 @@ def launch_component(script_name, title, delay=0):
             return False
             
         print(f"🔄 Launching {title}...")
-        subprocess.Popen([sys.executable, script_name])
+        subprocess.Popen([interpreter or sys.executable, script_name])
         print(f"✅ {title} launched successfully!")
         return True
         
@@ -34,9 +34,11 @@ def main():
     print("🚀 Remote Control System Auto Launcher")
     print("=" * 50)
     
-    # 1. Launch Mediator Server
+    # 1. Launch Mediator Server - MEDIATOR_PYTHON can point at a faster
+    # interpreter such as pypy3, the mediator is pure Python
     print("1️⃣ Starting Mediator Server...")
-    if not launch_component("mediator_server.py", "Mediator Server"):
+    if not launch_component("mediator_server.py", "Mediator Server",
+                            interpreter=os.environ.get("MEDIATOR_PYTHON")):
         return
     
     # 2. Launch Login System - First Instance
@@ -11,12 +11,53 @@ import hashlib
 import os
 import subprocess
 import sys
+import time
+import threading
 import secrets
+from secrets import compare_digest
+import concurrent.futures
+from functools import partial
 
 class ModernLoginSystem:
+    # Password rule tables, built once and shared by every validation call
+    SPECIAL_CHARS = frozenset("!@#$%^&*()_+-=[]{}|;:,.<>?")
+    COMMON_PASSWORDS = frozenset(['password', '12345678', 'qwerty123', 'admin123', 'password123'])
+    USERS_RELOAD_MS = 60000  # Pick up users added or reset from the admin panel
+    LOGIN_WINDOW = 60  # Seconds per sign in rate limit window
+    LOGIN_MAX_ATTEMPTS = 10  # Failed attempts allowed per username per window
+    
     def __init__(self):
         self.root = tk.Tk()
+        
+        # Worker pool for password hashing and database access
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+        
+        # Sign in or sign up job on the pool; new submits are ignored until it reports back
+        self._pending = None
+        
+        # Failed sign in attempts per username: username -> (window_start, failures)
+        self._login_attempts = {}
+        
+        # Resolve the role applications once instead of on every launch
+        self._scripts = {
+            'client': os.path.abspath("client_with_mediator.py"),
+            'technician': os.path.abspath("technician_with_mediator.py")
+        }
+        self._scripts_found = {role: os.path.isfile(path) for role, path in self._scripts.items()}
+        
         self.setup_database()
+        
+        # In-memory copy of the users table as (data_version, {username:
+        # (password, salt, role)}). It is only trusted while the database's
+        # data_version is the one it was loaded at, so writes from the admin
+        # panel take effect at once. Only _load_users replaces it, both parts
+        # in one assignment, so readers never pair a table with the wrong version
+        self._users = (None, {})
+        self._version_lock = threading.Lock()
+        self._version_conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._load_users()
+        self.root.after(self.USERS_RELOAD_MS, self._reload_users)
+        
         self.setup_modern_gui()
         
     def setup_database(self):
@@ -31,8 +72,8 @@ class ModernLoginSystem:
                 CREATE TABLE IF NOT EXISTS users (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     username TEXT UNIQUE NOT NULL,
-                    password TEXT NOT NULL,
-                    salt TEXT NOT NULL,
+                    password BLOB NOT NULL,
+                    salt BLOB NOT NULL,
                     role TEXT CHECK(role IN ('client', 'technician')) NOT NULL,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
@@ -52,6 +93,32 @@ class ModernLoginSystem:
         except Exception as e:
             messagebox.showerror("Database Error", f"Failed to initialize database: {str(e)}")
             
+    def _data_version(self):
+        """Return SQLite's data_version, which changes whenever another connection commits."""
+        with self._version_lock:
+            return self._version_conn.execute('PRAGMA data_version').fetchone()[0]
+            
+    def _load_users(self):
+        """Read the users table into memory so sign in can skip SQLite."""
+        try:
+            # Read the version first, so a commit racing the SELECT is caught later
+            version = self._data_version()
+            conn = sqlite3.connect(self.db_path)
+            try:
+                rows = conn.execute('SELECT username, password, salt, role FROM users').fetchall()
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Failed to load users: {e}")
+            return
+            
+        self._users = (version, {row[0]: row[1:] for row in rows})
+        
+    def _reload_users(self):
+        """Refresh the in-memory users on a worker and reschedule."""
+        self._pool.submit(self._load_users)
+        self.root.after(self.USERS_RELOAD_MS, self._reload_users)
+        
     def setup_modern_gui(self):
         """Set up the modern GUI interface."""
         # Window configuration
@@ -445,8 +512,8 @@ class ModernLoginSystem:
             "uppercase": any(c.isupper() for c in password),
             "lowercase": any(c.islower() for c in password),
             "number": any(c.isdigit() for c in password),
-            "special": any(c in "!@#$%^&*()_+-=[]{}|;:,.<>?" for c in password),
-            "common": password.lower() not in ['password', '12345678', 'qwerty123', 'admin123', 'password123']
+            "special": not self.SPECIAL_CHARS.isdisjoint(password),
+            "common": password.lower() not in self.COMMON_PASSWORDS
         }
         
         # Update visual indicators
@@ -610,14 +677,41 @@ class ModernLoginSystem:
         
     def generate_salt(self):
         """Generate a random salt for password hashing."""
-        return secrets.token_hex(32)  # 64 character hex string
+        return secrets.token_bytes(16)  # Raw bytes, stored as BLOB
         
     def hash_password(self, password, salt):
         """Hash password using SHA256 with salt."""
-        # Combine password and salt
-        salted_password = password + salt
-        return hashlib.sha256(salted_password.encode('utf-8')).hexdigest()
-        
+        return self._hash_raw(password.encode('utf-8'), salt)
+        
+    def _hash_raw(self, password_bytes, salt):
+        """Hash an already UTF-8 encoded password with a raw salt."""
+        return hashlib.sha256(password_bytes + salt).digest()
+        
+    def _hash_legacy(self, password_bytes, salt):
+        """Hash with a hex text salt, as stored before raw digests."""
+        hasher = hashlib.sha256(password_bytes)
+        hasher.update(salt.encode('utf-8'))
+        return hasher.hexdigest()
+        
+    def _rehash(self, username, password_bytes, role):
+        """Store a fresh raw salt and digest for a verified password on a worker."""
+        new_salt = self.generate_salt()
+        new_hash = self._hash_raw(password_bytes, new_salt)
+        self._pool.submit(self._do_password_upgrade, username, new_hash, new_salt)
+        
+    def _do_password_upgrade(self, username, new_hash, new_salt):
+        """Write an upgraded password - if this fails the next sign in migrates again."""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                conn.execute('UPDATE users SET password = ?, salt = ? WHERE username = ?', 
+                             (new_hash, new_salt, username))
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Failed to upgrade password for {username}: {e}")
+                     
     def validate_password_strength(self, password):
         """Validate password strength and return issues list."""
         issues = []
@@ -634,11 +728,11 @@ class ModernLoginSystem:
         if not any(c.isdigit() for c in password):
             issues.append("At least one number")
             
-        if not any(c in "!@#$%^&*()_+-=[]{}|;:,.<>?" for c in password):
+        if self.SPECIAL_CHARS.isdisjoint(password):
             issues.append("At least one special character (!@#$%^&*()_+-=[]{}|;:,.<>?)")
             
         # Check for common weak patterns
-        if password.lower() in ['password', '12345678', 'qwerty123', 'admin123', 'password123']:
+        if password.lower() in self.COMMON_PASSWORDS:
             issues.append("Cannot be a common weak password")
             
         # Check for repeated characters
@@ -649,7 +743,8 @@ class ModernLoginSystem:
     
     def validate_input(self, username, password, confirm_password=None):
         """Validate user input."""
-        if not username.strip():
+        username = username.strip()
+        if not username:
             self.show_error("Username cannot be empty!")
             return False
             
@@ -657,7 +752,7 @@ class ModernLoginSystem:
             self.show_error("Password cannot be empty!")
             return False
             
-        if len(username.strip()) < 3:
+        if len(username) < 3:
             self.show_error("Username must be at least 3 characters!")
             return False
             
@@ -818,53 +913,125 @@ class ModernLoginSystem:
         
     def handle_signin(self):
         """Handle sign in."""
+        if self._pending is not None:
+            return  # A second click or Enter while the first is still running
+            
         username = self.username_entry.get().strip()
         password = self.password_entry.get()
         
         if not self.validate_input(username, password):
             return
             
+        # Forget usernames whose window has run out, so trying ever new
+        # names can't grow the table without bound
+        now = time.monotonic()
+        expired = [name for name, (start, _) in self._login_attempts.items()
+                   if now - start > self.LOGIN_WINDOW]
+        for name in expired:
+            del self._login_attempts[name]
+            
+        # Refuse to hash at all once a username has used up its attempts
+        if self._login_attempts.get(username, (now, 0))[1] >= self.LOGIN_MAX_ATTEMPTS:
+            self.show_error("Too many sign in attempts!\nPlease wait a minute and try again.")
+            return
+            
+        # Hash and query on a worker, report back on the Tk thread
+        self._pending = self._pool.submit(self._do_login_work, username, password)
+        self._pending.add_done_callback(
+            lambda f: self.root.after(0, self._login_done, username, f.result()))
+            
+    def _do_login_work(self, username, password):
+        """Verify credentials off the Tk thread and return (status, payload)."""
+        # Encode once and reuse for every hash computed below
+        password_bytes = password.encode('utf-8')
+        
+        # Fast path: check the preloaded record without touching SQLite. Any
+        # commit since the load (a reset or deleted account) reloads it first;
+        # a miss or mismatch still falls through to the database
+        try:
+            version, users = self._users
+            if self._data_version() != version:
+                self._load_users()
+                version, users = self._users
+            cached = users.get(username) if self._data_version() == version else None
+        except Exception:
+            cached = None
+        if cached and isinstance(cached[1], bytes):
+            cached_password, cached_salt, cached_role = cached
+            if compare_digest(self._hash_raw(password_bytes, cached_salt), cached_password):
+                return 'ok', cached_role
+                
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
-            # First get the user's salt
-            cursor.execute('SELECT salt, password, role FROM users WHERE username = ?', (username,))
-            result = cursor.fetchone()
-            
-            if result:
+            try:
+                # First get the user's salt
+                cursor.execute('SELECT salt, password, role FROM users WHERE username = ?', (username,))
+                result = cursor.fetchone()
+                
+                if not result:
+                    return 'bad', None
+                    
                 stored_salt, stored_password, user_role = result
                 
                 # Handle users without salt (migration case)
                 if not stored_salt:
                     # For existing users without salt, check if they're using old plain hash
-                    old_hash = hashlib.sha256(password.encode('utf-8')).hexdigest()
-                    if old_hash == stored_password:
-                        # Migrate user to salted password
-                        new_salt = self.generate_salt()
-                        new_hash = self.hash_password(password, new_salt)
-                        cursor.execute('UPDATE users SET password = ?, salt = ? WHERE username = ?', 
-                                     (new_hash, new_salt, username))
-                        conn.commit()
-                        self.show_success(f"Welcome {username}!\nPassword security upgraded.\nLogging in as {user_role.title()}...")
-                        self.root.after(2000, lambda: self.launch_application(user_role, username))
-                    else:
-                        self.show_error("Invalid username or password!")
-                else:
-                    # Normal salted password verification
-                    hashed_password = self.hash_password(password, stored_salt)
-                    if hashed_password == stored_password:
-                        self.show_success(f"Welcome {username}!\nLogging in as {user_role.title()}...")
-                        self.root.after(1500, lambda: self.launch_application(user_role, username))
-                    else:
-                        self.show_error("Invalid username or password!")
-            else:
-                self.show_error("Invalid username or password!")
+                    old_hash = hashlib.sha256(password_bytes).hexdigest()
+                    if not compare_digest(old_hash, stored_password):
+                        return 'bad', None
+                        
+                    # Migrate user to salted password without waiting for the commit
+                    self._rehash(username, password_bytes, user_role)
+                    return 'upgrade', user_role
+                    
+                # Hex text hashes from before raw digests - verify, then convert
+                if isinstance(stored_salt, str):
+                    legacy_hash = self._hash_legacy(password_bytes, stored_salt)
+                    if not compare_digest(legacy_hash, stored_password):
+                        return 'bad', None
+                        
+                    self._rehash(username, password_bytes, user_role)
+                    return 'ok', user_role
+                    
+                # Normal salted password verification on raw 32-byte digests
+                hashed_password = self._hash_raw(password_bytes, stored_salt)
+                if compare_digest(hashed_password, stored_password):
+                    return 'ok', user_role
+                return 'bad', None
                 
-            conn.close()
+            finally:
+                conn.close()
                 
         except Exception as e:
-            self.show_error(f"Database error: {str(e)}")
+            return 'error', str(e)
+            
+    def _login_done(self, username, result):
+        """Show the sign in result on the Tk thread."""
+        status, payload = result
+        
+        # Stay locked once signed in, until the application launches
+        if status not in ('ok', 'upgrade'):
+            self._pending = None
+            
+        # Only failures count against the limit; a success clears them
+        if status == 'bad':
+            window_start, failures = self._login_attempts.get(username, (time.monotonic(), 0))
+            self._login_attempts[username] = (window_start, failures + 1)
+        elif status in ('ok', 'upgrade'):
+            self._login_attempts.pop(username, None)
+            
+        if status == 'ok':
+            self.show_success(f"Welcome {username}!\nLogging in as {payload.title()}...")
+            self.root.after(150, partial(self.launch_application, payload, username))
+        elif status == 'upgrade':
+            self.show_success(f"Welcome {username}!\nPassword security upgraded.\nLogging in as {payload.title()}...")
+            self.root.after(150, partial(self.launch_application, payload, username))
+        elif status == 'bad':
+            self.show_error("Invalid username or password!")
+        else:
+            self.show_error(f"Database error: {payload}")
             
     def handle_signup(self):
         """Handle sign up."""
@@ -873,38 +1040,59 @@ class ModernLoginSystem:
         confirm_password = self.reg_confirm_entry.get()
         role = self.selected_role.get()
         
+        if self._pending is not None:
+            return  # A second click or Enter while the first is still running
+            
         if not self.validate_input(username, password, confirm_password):
             return
             
+        # Hash and insert on a worker, report back on the Tk thread
+        self._pending = self._pool.submit(self._do_signup_work, username, password, role)
+        self._pending.add_done_callback(
+            lambda f: self.root.after(0, self._signup_done, username, role, f.result()))
+            
+    def _do_signup_work(self, username, password, role):
+        """Create the user off the Tk thread and return (status, payload)."""
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
-            # Check if user exists
-            cursor.execute('SELECT username FROM users WHERE username = ?', (username,))
-            if cursor.fetchone():
-                self.show_error("Username already exists!")
+            try:
+                # Create user with salt - the UNIQUE username constraint
+                # rejects duplicates, so no separate existence check is needed
+                salt = self.generate_salt()
+                hashed_password = self.hash_password(password, salt)
+                try:
+                    cursor.execute('''
+                        INSERT INTO users (username, password, salt, role) 
+                        VALUES (?, ?, ?, ?)
+                    ''', (username, hashed_password, salt, role))
+                except sqlite3.IntegrityError:
+                    return 'exists', None
+                    
+                conn.commit()
+                return 'ok', None
+                
+            finally:
                 conn.close()
-                return
                 
-            # Create user with salt
-            salt = self.generate_salt()
-            hashed_password = self.hash_password(password, salt)
-            cursor.execute('''
-                INSERT INTO users (username, password, salt, role) 
-                VALUES (?, ?, ?, ?)
-            ''', (username, hashed_password, salt, role))
-            
-            conn.commit()
-            conn.close()
+        except Exception as e:
+            return 'error', str(e)
             
+    def _signup_done(self, username, role, result):
+        """Show the sign up result on the Tk thread."""
+        self._pending = None
+        status, payload = result
+        
+        if status == 'ok':
             self.show_success(f"Account created successfully!\n{username} registered as {role.title()}")
             
             # Switch to login and prefill username
-            self.root.after(1500, lambda: self.switch_to_login_with_username(username))
-            
-        except Exception as e:
-            self.show_error(f"Database error: {str(e)}")
+            self.root.after(1500, partial(self.switch_to_login_with_username, username))
+        elif status == 'exists':
+            self.show_error("Username already exists!")
+        else:
+            self.show_error(f"Database error: {payload}")
             
     def switch_to_login_with_username(self, username):
         """Switch to login tab and prefill username."""
@@ -916,24 +1104,37 @@ class ModernLoginSystem:
     def launch_application(self, role, username):
         """Launch appropriate application."""
         try:
-            if role == "client":
-                script_path = "client_with_mediator.py"
-            else:
-                script_path = "technician_with_mediator.py"
-                
-            if not os.path.exists(script_path):
-                self.show_error(f"File {script_path} not found!")
+            script_role = 'client' if role == "client" else 'technician'
+            script_path = self._scripts[script_role]
+            
+            if not self._scripts_found[script_role]:
+                self._pending = None  # Let the user try again
+                self.show_error(f"File {os.path.basename(script_path)} not found!")
                 return
                 
             self.root.destroy()
-            subprocess.Popen([sys.executable, script_path, username])
+            args = [sys.executable, script_path, username]
+            
+            # Nothing is left to do here, so replace this process on POSIX
+            # instead of forking a child and keeping this interpreter alive
+            if os.name == 'posix':
+                # Let queued password upgrades commit before this process goes away
+                self._pool.shutdown(wait=True)
+                try:
+                    os.execv(sys.executable, args)
+                except OSError:
+                    pass
+            subprocess.Popen(args)
             
         except Exception as e:
+            self._pending = None
             self.show_error(f"Launch error: {str(e)}")
             
     def run(self):
         """Run the application."""
         self.root.mainloop()
+        self._pool.shutdown(wait=False)
+        self._version_conn.close()
 
 def main():
     try:
@@ -8,14 +8,28 @@ It handles help requests, control requests, and session management.
 import socket
 import threading
 import time
-import json
 import logging
+import selectors
+import collections
+import ssl
 import sys
-import uuid
+import os
+import itertools
+import secrets
+import concurrent.futures
+import tempfile
 from datetime import datetime
+from functools import lru_cache
 import tkinter as tk
 from tkinter import scrolledtext, ttk
 import ssl_utils
+import protocol_utils
+
+# Only used for the instance lock, which matters where SO_REUSEPORT is used
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 # Setup logging
 logging.basicConfig(
@@ -31,20 +45,122 @@ logger = logging.getLogger("MediatorServer")
 # Configuration
 MEDIATOR_PORT = 5556
 BUFFER_SIZE = 8192
-HEARTBEAT_INTERVAL = 30
+HEARTBEAT_INTERVAL = 30  # Idle seconds before the kernel starts keepalive probes
+KEEPALIVE_PROBE_INTERVAL = 10
+KEEPALIVE_PROBES = 3
+PRUNE_INTERVAL = 30  # Seconds between sweeps of expired help requests and sessions
+HELP_REQUEST_TTL = 3600  # Seconds before an unanswered help request is dropped
+GUI_UPDATE_MS = 500
+LOG_QUEUE_LINES = 5000  # Oldest pending lines are dropped past this
+LOG_BATCH_LINES = 200  # Lines written to the log view per GUI update
+LOG_MAX_LINES = 10000  # Lines kept in the log view
+
+MAX_PENDING_BYTES = 4 * 1024 * 1024  # Unsent output allowed before a peer is dropped
+
+# Messages that never change are encoded once
+HELP_CONFIRMED_FRAME = protocol_utils.encode_message({
+    'type': 'help_confirmed',
+    'message': 'Your help request has been sent to available technicians'
+})
+
+# JSON templates for fixed-shape messages, see protocol_utils.encode_template
+CLIENT_NOTICE_TEMPLATE = '{{"type":"{type}","client_id":"{client_id}"}}'
+CONTROL_APPROVED_TEMPLATE = ('{{"type":"control_approved","client_id":"{client_id}","client_ip":"{client_ip}",'
+                             '"client_name":"{client_name}","session_id":"{session_id}"}}')
+CONTROL_DENIED_TEMPLATE = '{{"type":"control_denied","client_id":"{client_id}","client_name":"{client_name}"}}'
+
+@lru_cache(maxsize=1024)
+def client_notice_frame(msg_type, client_id):
+    """Encoded frame for a notice that only names a client; repeats reuse the bytes."""
+    return protocol_utils.encode_template(CLIENT_NOTICE_TEMPLATE, {'type': msg_type, 'client_id': client_id})
+
+class PeerState:
+    """Connection state for one client or technician."""
+    __slots__ = ('role', 'peer_id', 'socket', 'ip', 'name', 'help_requested', 'session_id',
+                 'assigned_client', 'connected_time', 'rx_buf',
+                 'tx_buf', 'tx_lock', 'events', 'connected_label')
+    
+    def __init__(self, role, peer_id, sock, ip, name):
+        self.role = role  # 'client' or 'technician'
+        self.peer_id = peer_id
+        self.socket = sock
+        self.ip = ip
+        self.name = name
+        self.help_requested = False  # Clients only
+        self.session_id = None  # Active session, for clients and technicians alike
+        self.assigned_client = None  # Technicians only
+        self.connected_time = datetime.now()
+        self.connected_label = self.connected_time.strftime("%H:%M:%S")  # Formatted once for the GUI
+        self.rx_buf = bytearray()  # Received bytes not yet parsed into messages
+        self.tx_buf = bytearray()  # Encoded frames not yet written
+        self.tx_lock = threading.Lock()
+        self.events = 0  # Selector events registered, 0 until the welcome is sent
+
+class SessionState:
+    """A control session between one client and one technician."""
+    __slots__ = ('client_id', 'tech_id', 'start_time', 'start_label')
+    
+    def __init__(self, client_id, tech_id):
+        self.client_id = client_id
+        self.tech_id = tech_id
+        self.start_time = datetime.now()
+        self.start_label = self.start_time.strftime("%H:%M:%S")  # Formatted once for the GUI
 
 class MediatorServer:
     def __init__(self):
         self.running = False
-        self.server_socket = None
+        self.server_sockets = []  # One listener, or several sharing the port via SO_REUSEPORT
+        self.conn_pool = None  # Handshake workers, created in start_server
+        self._port_lock = None  # Instance lock file descriptor while serving
+        self.sel = None  # Readiness selector for every connected peer socket
+        self._wake = None  # Socket pair that interrupts the selector for new output
+        self._io_thread_ident = None
+        self._tx_pending = collections.deque()  # Peers with output to write
+        self.recv_pool = protocol_utils.BufferPool(BUFFER_SIZE, 128)
         
         # Connected entities
-        self.clients = {}  # client_id: {socket, ip, name, help_requested, session_id}
-        self.technicians = {}  # tech_id: {socket, ip, name, assigned_client}
+        self.clients = {}  # client_id: PeerState
+        self.technicians = {}  # tech_id: PeerState
+        
+        # Held around adding and removing peers; readers iterate snapshots
+        self._clients_lock = threading.RLock()
+        self._techs_lock = threading.RLock()
+        
+        # Immutable (id, PeerState) tuple, rebuilt only when membership changes
+        self._tech_snapshot = ()
         
         # Help requests and active sessions
         self.help_requests = {}  # client_id: {timestamp, status}
-        self.active_sessions = {}  # session_id: {client_id, tech_id, start_time}
+        self.active_sessions = {}  # session_id: SessionState
+        
+        # Peer IDs only need to be unique within this process; seeding from the
+        # clock keeps them from repeating right after a restart. Session IDs
+        # are random, so one technician can't guess another's
+        seed = (int(time.time()) & 0xffff) << 16
+        self._peer_ids = itertools.count(seed)
+        
+        self._time_cache = {}  # strftime format: (second, formatted text)
+        
+        # Message type: handler(peer_id, message)
+        self._client_handlers = {
+            'help_request': self.handle_help_request,
+            'cancel_help': self.handle_cancel_help,
+            'control_response': self.handle_control_response,
+            'heartbeat_response': self.handle_heartbeat_response
+        }
+        self._technician_handlers = {
+            'request_control': self.handle_control_request,
+            'end_session': self.handle_end_session,
+            'heartbeat_response': self.handle_heartbeat_response
+        }
+        
+        # Log lines waiting for the GUI, and the rows each tree last showed
+        self._log_lines = collections.deque(maxlen=LOG_QUEUE_LINES)
+        self._last_render = {'clients': {}, 'techs': {}, 'sessions': {}}
+        
+        # Ids of peers whose row needs redrawing; appended from any thread
+        self._dirty_clients = collections.deque()
+        self._dirty_techs = collections.deque()
         
         self.setup_gui()
         
@@ -407,16 +523,41 @@ class MediatorServer:
         
     def log(self, message):
         """Add a message to the log."""
-        timestamp = datetime.now().strftime("%H:%M:%S")
+        timestamp = self._format_now("%H:%M:%S")
         log_message = f"[{timestamp}] {message}"
         logger.info(message)
         
-        # Update GUI log
-        self.root.after(0, lambda: self._update_log_gui(log_message))
+        # Queue for the GUI - update_gui writes it on the Tk thread
+        self._log_lines.append(log_message)
+        
+    def _format_now(self, fmt):
+        """Format the local time, reusing the string within the same second."""
+        now = int(time.time())
+        cached = self._time_cache.get(fmt)
+        if cached and cached[0] == now:
+            return cached[1]
+            
+        text = time.strftime(fmt, time.localtime(now))
+        self._time_cache[fmt] = (now, text)
+        return text
+        
+    def _update_log_gui(self):
+        """Write queued log lines to the GUI log in the main thread."""
+        lines = []
+        while self._log_lines and len(lines) < LOG_BATCH_LINES:
+            lines.append(self._log_lines.popleft())
+            
+        if not lines:
+            return
+            
+        # One insert and one scroll for the whole batch
+        self.log_text.insert(tk.END, "\n".join(lines) + "\n")
         
-    def _update_log_gui(self, message):
-        """Update the GUI log in the main thread."""
-        self.log_text.insert(tk.END, message + "\n")
+        # Trim the oldest lines so the text widget stays fast
+        line_count = int(self.log_text.index('end-1c').split('.')[0])
+        if line_count > LOG_MAX_LINES:
+            self.log_text.delete('1.0', f'{line_count - LOG_MAX_LINES + 1}.0')
+            
         self.log_text.see(tk.END)
         
     def start_server(self):
@@ -430,9 +571,37 @@ class MediatorServer:
                 self.log("❌ Failed to initialize SSL certificates")
                 return
                 
-            # Create secure server socket
-            self.server_socket = ssl_utils.create_secure_server_socket("0.0.0.0", MEDIATOR_PORT)
-            self.server_socket.listen(50)  # Allow many connections
+            # Create secure server sockets - on Linux several listeners share the
+            # port and the kernel spreads incoming connections across them
+            if sys.platform.startswith('linux') and hasattr(socket, 'SO_REUSEPORT') and fcntl:
+                listeners = min(4, os.cpu_count() or 1)
+            else:
+                listeners = 1
+                
+            if listeners > 1 and not self._claim_port():
+                self.log(f"❌ Another mediator server is already running on port {MEDIATOR_PORT}")
+                return
+                
+            self.server_sockets = []
+            for _ in range(listeners):
+                server_socket = ssl_utils.create_secure_server_socket(
+                    "0.0.0.0", MEDIATOR_PORT, reuse_port=listeners > 1,
+                    handshake_on_accept=False)
+                server_socket.listen(50)  # Allow many connections
+                self.server_sockets.append(server_socket)
+            
+            # CPUs the IO and accept threads get pinned to, one each, round-robin
+            if hasattr(os, 'sched_setaffinity'):
+                cpus = sorted(os.sched_getaffinity(0))
+            else:
+                cpus = []
+                
+            # Bounded pool for connection handshakes instead of a thread each;
+            # workers get the full CPU set back rather than their acceptor's core
+            self.conn_pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=min(64, (os.cpu_count() or 4) * 8),
+                thread_name_prefix="mediator-conn",
+                initializer=self._pin_thread, initargs=(cpus,))
             
             self.running = True
             self.status_label.config(text="🔐 Running (SSL)", fg='#90ff90')
@@ -441,44 +610,89 @@ class MediatorServer:
             
             self.log(f"🔐 Secure mediator server started on port {MEDIATOR_PORT} with SSL/TLS encryption")
             
-            # Start accepting connections
-            threading.Thread(target=self.accept_connections, daemon=True).start()
+            # One thread reads and writes every peer socket through the selector
+            self.sel = selectors.DefaultSelector()
+            self._wake = socket.socketpair()
+            for wake_socket in self._wake:
+                wake_socket.setblocking(False)
+            self.sel.register(self._wake[0], selectors.EVENT_READ, data=None)
+            threading.Thread(target=self._io_loop, args=(self.sel, self._wake, cpus[:1]), 
+                           daemon=True).start()
             
-            # Start heartbeat checker
-            threading.Thread(target=self.heartbeat_checker, daemon=True).start()
+            # Start accepting connections, one thread per listener
+            for index, server_socket in enumerate(self.server_sockets, 1):
+                cpu = [cpus[index % len(cpus)]] if cpus else []
+                threading.Thread(target=self.accept_connections, 
+                               args=(server_socket, cpu), daemon=True).start()
             
         except Exception as e:
+            self._release_port()
             self.log(f"❌ Error starting secure server: {str(e)}")
             
+    def _claim_port(self):
+        """Take the instance lock for MEDIATOR_PORT, False if another mediator holds it."""
+        # With SO_REUSEPORT a second mediator binds the same port without an
+        # error, and the kernel would split clients and technicians between them
+        path = os.path.join(tempfile.gettempdir(), f"mediator-{MEDIATOR_PORT}.lock")
+        lock_fd = os.open(path, os.O_RDONLY | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(lock_fd)
+            return False
+        self._port_lock = lock_fd
+        return True
+        
+    def _release_port(self):
+        """Drop the instance lock taken by _claim_port, if any."""
+        if self._port_lock is not None:
+            os.close(self._port_lock)
+            self._port_lock = None
+            
     def stop_server(self):
         """Stop the mediator server."""
         self.running = False
-        
+        self._wake_io()  # Let the selector loop see running is off
+        
+        # Swap in empty tables so the old ones can be walked without copying
+        with self._clients_lock:
+            old_clients, self.clients = self.clients, {}
+        with self._techs_lock:
+            old_techs, self.technicians = self.technicians, {}
+            self._tech_snapshot = ()
+        self._dirty_clients.extend(old_clients)
+        self._dirty_techs.extend(old_techs)
+            
         # Close all client connections
-        for client_id, client_info in list(self.clients.items()):
+        for client_info in old_clients.values():
             try:
-                client_info['socket'].close()
-            except:
+                client_info.socket.close()
+            except OSError:
                 pass
                 
         # Close all technician connections
-        for tech_id, tech_info in list(self.technicians.items()):
+        for tech_info in old_techs.values():
             try:
-                tech_info['socket'].close()
-            except:
+                tech_info.socket.close()
+            except OSError:
                 pass
                 
-        # Close server socket
-        if self.server_socket:
+        # Close server sockets
+        for server_socket in self.server_sockets:
             try:
-                self.server_socket.close()
-            except:
+                server_socket.close()
+            except OSError:
                 pass
-                
-        self.clients.clear()
-        self.technicians.clear()
+        self.server_sockets = []
+        self._release_port()
+        
+        # Drop handshakes that have not started yet
+        if self.conn_pool:
+            self.conn_pool.shutdown(wait=False, cancel_futures=True)
+            
         self.help_requests.clear()
         self.active_sessions.clear()
+        client_notice_frame.cache_clear()
         
         self.status_label.config(text="⭕ Stopped", fg="#ffccd5")
         self.start_button.config(state=tk.NORMAL)
@@ -486,34 +700,67 @@ class MediatorServer:
         
         self.log("🛑 Mediator server stopped")
         
-    def accept_connections(self):
+    def _enable_keepalive(self, sock):
+        """Let the kernel probe idle peers so dead links surface as read errors."""
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        for option, value in (('TCP_KEEPIDLE', HEARTBEAT_INTERVAL),
+                              ('TCP_KEEPINTVL', KEEPALIVE_PROBE_INTERVAL),
+                              ('TCP_KEEPCNT', KEEPALIVE_PROBES)):
+            if hasattr(socket, option):  # Not every platform exposes all three
+                sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+                
+    def _pin_thread(self, cpus):
+        """Restrict the calling thread to the given CPUs (Linux only)."""
+        if cpus:
+            try:
+                os.sched_setaffinity(0, cpus)
+            except OSError:
+                pass
+                
+    def accept_connections(self, server_socket, cpus=()):
         """Accept incoming connections from clients and technicians."""
+        self._pin_thread(cpus)
+        
         while self.running:
             try:
-                client_socket, client_address = self.server_socket.accept()
-                self.log(f"New connection from {client_address[0]}:{client_address[1]}")
-                
-                # Handle connection in separate thread
-                threading.Thread(target=self.handle_connection, 
-                               args=(client_socket, client_address), daemon=True).start()
-                               
-            except socket.error:
+                client_socket, client_address = server_socket.accept()
+            except ConnectionError:
+                continue  # Peer gave up before we accepted it
+            except OSError:
                 if self.running:
                     self.log("Error accepting connection")
                 break
                 
+            self.log(f"New connection from {client_address[0]}:{client_address[1]}")
+            
+            # Handshake and identify the connection on the pool
+            try:
+                self.conn_pool.submit(self.handle_connection, client_socket, client_address)
+            except RuntimeError:  # Pool shut down by stop_server
+                client_socket.close()
+                break
+                
     def handle_connection(self, client_socket, client_address):
         """Handle a new connection (client or technician)."""
         try:
             client_socket.settimeout(60)  # 1 minute timeout for initial handshake
             
+            # Control messages are small and interactive - don't let Nagle hold them
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._enable_keepalive(client_socket)
+            
+            # The TLS handshake runs here on the pool, not in the accept thread
+            client_socket.do_handshake()
+            
             # Wait for identification message
-            data = client_socket.recv(BUFFER_SIZE)
-            if not data:
+            chunk = self.recv_pool.acquire()
+            try:
+                message = protocol_utils.recv_message(client_socket, chunk)
+            finally:
+                self.recv_pool.release(chunk)
+            if message is None:
                 return
                 
-            message = json.loads(data.decode('utf-8'))
-            
             if message['type'] == 'client_connect':
                 self.handle_client_connection(client_socket, client_address, message)
             elif message['type'] == 'technician_connect':
@@ -526,23 +773,19 @@ class MediatorServer:
             self.log(f"Error handling connection from {client_address[0]}: {str(e)}")
             try:
                 client_socket.close()
-            except:
+            except OSError:
                 pass
                 
     def handle_client_connection(self, client_socket, client_address, message):
         """Handle a client connection."""
-        client_id = str(uuid.uuid4())[:8]
+        client_id = f"{next(self._peer_ids):08x}"
         client_name = message.get('name', f"Client-{client_address[0]}")
         
         # Store client info
-        self.clients[client_id] = {
-            'socket': client_socket,
-            'ip': client_address[0],
-            'name': client_name,
-            'help_requested': False,
-            'session_id': None,
-            'connected_time': datetime.now()
-        }
+        client_info = PeerState('client', client_id, client_socket, client_address[0], client_name)
+        with self._clients_lock:
+            self.clients[client_id] = client_info
+        self._dirty_clients.append(client_id)
         
         # Send welcome message
         response = {
@@ -552,40 +795,39 @@ class MediatorServer:
         }
         
         try:
-            client_socket.send(json.dumps(response).encode('utf-8'))
+            protocol_utils.send_message(client_socket, response)
             self.log(f"Client '{client_name}' connected with ID: {client_id}")
             
-            # Handle client messages
-            threading.Thread(target=self.handle_client_messages, 
-                           args=(client_id,), daemon=True).start()
-                           
+            # Hand the socket to the selector loop for its messages
+            self._start_io(client_info)
+            
         except Exception as e:
             self.log(f"Error welcoming client: {str(e)}")
             self.disconnect_client(client_id)
             
     def handle_technician_connection(self, tech_socket, tech_address, message):
         """Handle a technician connection."""
-        tech_id = str(uuid.uuid4())[:8]
+        tech_id = f"{next(self._peer_ids):08x}"
         tech_name = message.get('name', f"Tech-{tech_address[0]}")
         
         # Store technician info
-        self.technicians[tech_id] = {
-            'socket': tech_socket,
-            'ip': tech_address[0],
-            'name': tech_name,
-            'assigned_client': None,
-            'connected_time': datetime.now()
-        }
-        
-        # Send welcome message with current help requests
+        tech_info = PeerState('technician', tech_id, tech_socket, tech_address[0], tech_name)
+        with self._techs_lock:
+            self.technicians[tech_id] = tech_info
+            self._tech_snapshot = tuple(self.technicians.items())
+        self._dirty_techs.append(tech_id)
+        
+        # Send welcome message with current help requests - help_requests only
+        # holds pending clients, so this skips every client not asking for help
         help_list = []
-        for client_id, client_info in self.clients.items():
-            if client_info['help_requested'] and not client_info['session_id']:
+        for client_id, request in list(self.help_requests.items()):
+            client_info = self.clients.get(client_id)
+            if client_info and client_info.help_requested and not client_info.session_id:
                 help_list.append({
                     'client_id': client_id,
-                    'name': client_info['name'],
-                    'ip': client_info['ip'],
-                    'timestamp': self.help_requests.get(client_id, {}).get('timestamp', '')
+                    'name': client_info.name,
+                    'ip': client_info.ip,
+                    'timestamp': request['timestamp']
                 })
                 
         response = {
@@ -596,178 +838,267 @@ class MediatorServer:
         }
         
         try:
-            tech_socket.send(json.dumps(response).encode('utf-8'))
+            protocol_utils.send_message(tech_socket, response)
             self.log(f"Technician '{tech_name}' connected with ID: {tech_id}")
             
-            # Handle technician messages
-            threading.Thread(target=self.handle_technician_messages, 
-                           args=(tech_id,), daemon=True).start()
-                           
+            # Hand the socket to the selector loop for its messages
+            self._start_io(tech_info)
+            
         except Exception as e:
             self.log(f"Error welcoming technician: {str(e)}")
             self.disconnect_technician(tech_id)
             
-    def handle_client_messages(self, client_id):
-        """Handle messages from a specific client."""
-        if client_id not in self.clients:
-            return
-            
-        client_socket = self.clients[client_id]['socket']
+    def _start_io(self, peer):
+        """Register a welcomed peer with the selector loop."""
+        peer.socket.setblocking(False)
+        peer.events = selectors.EVENT_READ
+        self.sel.register(peer.socket, peer.events, data=peer)
         
-        try:
-            while self.running and client_id in self.clients:
-                try:
-                    client_socket.settimeout(HEARTBEAT_INTERVAL + 10)
-                    data = client_socket.recv(BUFFER_SIZE)
-                    
-                    if not data:
-                        break
-                        
-                    message = json.loads(data.decode('utf-8'))
-                    self.process_client_message(client_id, message)
-                    
-                except socket.timeout:
-                    # Send heartbeat
-                    heartbeat = {'type': 'heartbeat'}
-                    client_socket.send(json.dumps(heartbeat).encode('utf-8'))
+        # Flush anything queued for the peer while it was being welcomed
+        self._tx_pending.append(peer)
+        self._wake_io()
+        
+    def _io_loop(self, sel, wake, cpus=()):
+        """Read and write messages for every connected peer on a single thread."""
+        self._io_thread_ident = threading.get_ident()
+        self._pin_thread(cpus)
+        
+        # Stale state is swept on this loop as a timer rather than on its own
+        # thread, and only while there is something that could go stale
+        next_prune = None
+        
+        while self.running:
+            # Sleep until the next sweep, or until something happens if none is
+            # due - peer traffic and _wake_io() end the wait early
+            timeout = None if next_prune is None else max(0, next_prune - time.monotonic())
+            try:
+                events = sel.select(timeout=timeout)
+            except (OSError, ValueError):
+                break
+                
+            for key, mask in events:
+                peer = key.data
+                if peer is None:
+                    self._drain_wakeups(key.fileobj)
+                    continue
                     
-                except ConnectionError:
-                    break
-                except Exception as e:
-                    self.log(f"Error handling client {client_id} message: {str(e)}")
-                    break
+                if mask & selectors.EVENT_READ:
+                    self._read_peer(peer)
+                if mask & selectors.EVENT_WRITE:
+                    self._flush_peer(peer)
                     
-        except Exception as e:
-            self.log(f"Error in client {client_id} message handler: {str(e)}")
-        finally:
-            self.disconnect_client(client_id)
+            if self.help_requests or self.active_sessions:
+                now = time.monotonic()
+                if next_prune is None:
+                    next_prune = now + PRUNE_INTERVAL
+                elif now >= next_prune:
+                    self._prune_stale_state()
+                    next_prune = now + PRUNE_INTERVAL
+            else:
+                next_prune = None
+                
+            # Write what the handlers above and other threads queued
+            while self._tx_pending:
+                self._flush_peer(self._tx_pending.popleft())
+                
+        sel.close()
+        for wake_socket in wake:
+            wake_socket.close()
+            
+    def _drain_wakeups(self, wake_socket):
+        """Discard the wakeup bytes other threads sent to the selector loop."""
+        try:
+            while wake_socket.recv(4096):
+                pass
+        except OSError:
+            pass
+            
+    def _wake_io(self):
+        """Interrupt the selector loop so it writes newly queued output."""
+        try:
+            self._wake[1].send(b'\0')
+        except (OSError, TypeError):
+            pass  # Already woken (buffer full) or the server is stopped
             
-    def handle_technician_messages(self, tech_id):
-        """Handle messages from a specific technician."""
-        if tech_id not in self.technicians:
+    def _disconnect_peer(self, peer):
+        """Disconnect a client or technician by its state object."""
+        if peer.role == 'client':
+            self.disconnect_client(peer.peer_id)
+        else:
+            self.disconnect_technician(peer.peer_id)
+            
+    def _read_peer(self, peer):
+        """Drain a readable peer socket and process each complete message."""
+        peers = self.clients if peer.role == 'client' else self.technicians
+        if peers.get(peer.peer_id) is not peer:
+            self._unregister(peer.socket)
             return
             
-        tech_socket = self.technicians[tech_id]['socket']
+        if peer.role == 'client':
+            process = self.process_client_message
+        else:
+            process = self.process_technician_message
+            
+        chunk = self.recv_pool.acquire()
         
         try:
-            while self.running and tech_id in self.technicians:
-                try:
-                    tech_socket.settimeout(HEARTBEAT_INTERVAL + 10)
-                    data = tech_socket.recv(BUFFER_SIZE)
-                    
-                    if not data:
+            # SSL can hold decrypted bytes the selector does not see, so
+            # keep reading until the socket would block
+            with memoryview(chunk) as view:
+                while True:
+                    try:
+                        received = peer.socket.recv_into(view)
+                    except (ssl.SSLWantReadError, ssl.SSLWantWriteError, BlockingIOError):
                         break
                         
-                    message = json.loads(data.decode('utf-8'))
-                    self.process_technician_message(tech_id, message)
-                    
-                except socket.timeout:
-                    # Send heartbeat
-                    heartbeat = {'type': 'heartbeat'}
-                    tech_socket.send(json.dumps(heartbeat).encode('utf-8'))
-                    
-                except ConnectionError:
-                    break
-                except Exception as e:
-                    self.log(f"Error handling technician {tech_id} message: {str(e)}")
-                    break
+                    if not received:
+                        self._disconnect_peer(peer)
+                        return
+                        
+                    peer.rx_buf += view[:received]
                     
+            for message in protocol_utils.parse_messages(peer.rx_buf):
+                process(peer.peer_id, message)
+                
+        except ConnectionError:
+            self._disconnect_peer(peer)
         except Exception as e:
-            self.log(f"Error in technician {tech_id} message handler: {str(e)}")
+            self.log(f"Error handling message from {peer.peer_id}: {str(e)}")
+            self._disconnect_peer(peer)
         finally:
-            self.disconnect_technician(tech_id)
+            self.recv_pool.release(chunk)
             
-    def process_client_message(self, client_id, message):
-        """Process a message from a client."""
-        msg_type = message.get('type')
-        
-        if msg_type == 'help_request':
-            self.handle_help_request(client_id)
+    def _flush_peer(self, peer):
+        """Write as much of a peer's queued output as its socket accepts now."""
+        if not peer.events or peer.socket.fileno() == -1:
+            return  # Not welcomed yet, or already disconnected
             
-        elif msg_type == 'cancel_help':
-            self.handle_cancel_help(client_id)
+        try:
+            with peer.tx_lock:
+                # Everything queued goes out in as few sends as the socket allows;
+                # the sent bytes are trimmed once at the end instead of per send
+                total = len(peer.tx_buf)
+                offset = 0
+                try:
+                    with memoryview(peer.tx_buf) as view:
+                        while offset < total:
+                            try:
+                                offset += peer.socket.send(view[offset:])
+                            except (ssl.SSLWantWriteError, ssl.SSLWantReadError, BlockingIOError):
+                                break
+                finally:
+                    del peer.tx_buf[:offset]
+                waiting = len(peer.tx_buf)
+        except OSError as e:
+            self.log(f"Error sending to {peer.peer_id}: {str(e)}")
+            self._disconnect_peer(peer)
+            return
             
-        elif msg_type == 'control_response':
-            self.handle_control_response(client_id, message)
+        if waiting > MAX_PENDING_BYTES:
+            self.log(f"Dropping {peer.peer_id}: too much unsent output")
+            self._disconnect_peer(peer)
+            return
             
-        elif msg_type == 'heartbeat_response':
-            pass  # Client is alive
+        # Only ask for write readiness while output is waiting
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if waiting else 0)
+        if events != peer.events:
+            try:
+                self.sel.modify(peer.socket, events, data=peer)
+                peer.events = events
+            except (KeyError, ValueError, OSError):
+                pass
+                
+    def _unregister(self, sock):
+        """Stop watching a peer socket."""
+        try:
+            self.sel.unregister(sock)
+        except (KeyError, ValueError, OSError, AttributeError):
+            pass
             
-        else:
-            self.log(f"Unknown message type from client {client_id}: {msg_type}")
+    def _send_msg(self, peer, message):
+        """Queue a message for a peer."""
+        self._send_frame(peer, protocol_utils.encode_message(message))
+        
+    def _send_frame(self, peer, frame, wake=True):
+        """Queue already encoded frame bytes for a peer; the selector loop writes them."""
+        with peer.tx_lock:
+            peer.tx_buf += frame
+        self._tx_pending.append(peer)
+        
+        if wake and threading.get_ident() != self._io_thread_ident:
+            self._wake_io()
+            
+    def process_client_message(self, client_id, message):
+        """Process a message from a client."""
+        handler = self._client_handlers.get(message.get('type'))
+        if handler is None:
+            self.log(f"Unknown message type from client {client_id}: {message.get('type')}")
+            return
             
+        handler(client_id, message)
+        
     def process_technician_message(self, tech_id, message):
         """Process a message from a technician."""
-        msg_type = message.get('type')
-        
-        if msg_type == 'request_control':
-            self.handle_control_request(tech_id, message)
-            
-        elif msg_type == 'end_session':
-            self.handle_end_session(tech_id, message)
-            
-        elif msg_type == 'heartbeat_response':
-            pass  # Technician is alive
-            
-        else:
-            self.log(f"Unknown message type from technician {tech_id}: {msg_type}")
+        handler = self._technician_handlers.get(message.get('type'))
+        if handler is None:
+            self.log(f"Unknown message type from technician {tech_id}: {message.get('type')}")
+            return
             
-    def handle_help_request(self, client_id):
+        handler(tech_id, message)
+        
+    def handle_heartbeat_response(self, peer_id, message):
+        """Handle a heartbeat response - the mediator no longer sends heartbeats, so ignore it."""
+        pass
+        
+    def handle_help_request(self, client_id, message=None):
         """Handle a help request from a client."""
         if client_id not in self.clients:
             return
             
         # Mark client as requesting help
-        self.clients[client_id]['help_requested'] = True
+        self.clients[client_id].help_requested = True
+        self._dirty_clients.append(client_id)
         self.help_requests[client_id] = {
-            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'timestamp': self._format_now("%Y-%m-%d %H:%M:%S"),
+            'ts_mono': time.monotonic(),
             'status': 'pending'
         }
         
         client_info = self.clients[client_id]
-        self.log(f"Help request from client '{client_info['name']}' ({client_info['ip']})")
+        self.log(f"Help request from client '{client_info.name}' ({client_info.ip})")
         
         # Notify all technicians
         help_notification = {
             'type': 'new_help_request',
             'client_id': client_id,
-            'name': client_info['name'],
-            'ip': client_info['ip'],
+            'name': client_info.name,
+            'ip': client_info.ip,
             'timestamp': self.help_requests[client_id]['timestamp']
         }
         
         self.broadcast_to_technicians(help_notification)
         
         # Confirm to client
-        response = {
-            'type': 'help_confirmed',
-            'message': 'Your help request has been sent to available technicians'
-        }
-        
         try:
-            self.clients[client_id]['socket'].send(json.dumps(response).encode('utf-8'))
+            self._send_frame(self.clients[client_id], HELP_CONFIRMED_FRAME)
         except Exception as e:
             self.log(f"Error confirming help request to client {client_id}: {str(e)}")
             
-    def handle_cancel_help(self, client_id):
+    def handle_cancel_help(self, client_id, message=None):
         """Handle help cancellation from a client."""
         if client_id not in self.clients:
             return
             
-        self.clients[client_id]['help_requested'] = False
+        self.clients[client_id].help_requested = False
+        self._dirty_clients.append(client_id)
         if client_id in self.help_requests:
             del self.help_requests[client_id]
             
         client_info = self.clients[client_id]
-        self.log(f"Help request cancelled by client '{client_info['name']}'")
+        self.log(f"Help request cancelled by client '{client_info.name}'")
         
         # Notify technicians
-        cancel_notification = {
-            'type': 'help_cancelled',
-            'client_id': client_id
-        }
-        
-        self.broadcast_to_technicians(cancel_notification)
+        self.broadcast_frame(client_notice_frame('help_cancelled', client_id))
         
     def handle_control_request(self, tech_id, message):
         """Handle a control request from a technician."""
@@ -779,18 +1110,18 @@ class MediatorServer:
         client_info = self.clients[client_id]
         tech_info = self.technicians[tech_id]
         
-        self.log(f"Control request: Technician '{tech_info['name']}' -> Client '{client_info['name']}'")
+        self.log(f"Control request: Technician '{tech_info.name}' -> Client '{client_info.name}'")
         
         # Send control request to client
         control_request = {
             'type': 'control_request',
-            'technician_name': tech_info['name'],
-            'technician_ip': tech_info['ip'],
+            'technician_name': tech_info.name,
+            'technician_ip': tech_info.ip,
             'tech_id': tech_id
         }
         
         try:
-            client_info['socket'].send(json.dumps(control_request).encode('utf-8'))
+            self._send_msg(client_info, control_request)
         except Exception as e:
             self.log(f"Error sending control request to client {client_id}: {str(e)}")
             
@@ -807,180 +1138,183 @@ class MediatorServer:
         
         if approved:
             # Create session
-            session_id = str(uuid.uuid4())[:8]
-            self.active_sessions[session_id] = {
-                'client_id': client_id,
-                'tech_id': tech_id,
-                'start_time': datetime.now()
-            }
+            session_id = secrets.token_hex(4)
+            self.active_sessions[session_id] = SessionState(client_id, tech_id)
             
             # Update client and technician status
-            self.clients[client_id]['session_id'] = session_id
-            self.clients[client_id]['help_requested'] = False
-            self.technicians[tech_id]['assigned_client'] = client_id
+            self.clients[client_id].session_id = session_id
+            self.clients[client_id].help_requested = False
+            self.technicians[tech_id].assigned_client = client_id
+            self.technicians[tech_id].session_id = session_id
+            self._dirty_clients.append(client_id)
+            self._dirty_techs.append(tech_id)
             
             # Remove from help requests
             if client_id in self.help_requests:
                 del self.help_requests[client_id]
                 
-            self.log(f"Control session started: {tech_info['name']} -> {client_info['name']} (Session: {session_id})")
+            self.log(f"Control session started: {tech_info.name} -> {client_info.name} (Session: {session_id})")
             
             # Notify technician - include client IP for direct connection
-            response = {
+            response = protocol_utils.encode_template(CONTROL_APPROVED_TEMPLATE, {
                 'type': 'control_approved',
                 'client_id': client_id,
-                'client_ip': client_info['ip'],
-                'client_name': client_info['name'],
+                'client_ip': client_info.ip,
+                'client_name': client_info.name,
                 'session_id': session_id
-            }
+            })
             
         else:
-            self.log(f"Control request denied: {client_info['name']} denied {tech_info['name']}")
-            response = {
+            self.log(f"Control request denied: {client_info.name} denied {tech_info.name}")
+            response = protocol_utils.encode_template(CONTROL_DENIED_TEMPLATE, {
                 'type': 'control_denied',
                 'client_id': client_id,
-                'client_name': client_info['name']
-            }
+                'client_name': client_info.name
+            })
             
         try:
-            tech_info['socket'].send(json.dumps(response).encode('utf-8'))
+            self._send_frame(tech_info, response)
         except Exception as e:
             self.log(f"Error sending control response to technician {tech_id}: {str(e)}")
             
         # Notify other technicians that this client is no longer available
         if approved:
-            unavailable_notification = {
-                'type': 'client_unavailable',
-                'client_id': client_id
-            }
-            self.broadcast_to_technicians(unavailable_notification, exclude_tech=tech_id)
+            self.broadcast_frame(client_notice_frame('client_unavailable', client_id),
+                                 exclude_tech=tech_id)
             
     def handle_end_session(self, tech_id, message):
         """Handle session end from technician."""
         session_id = message.get('session_id')
         
-        if session_id not in self.active_sessions:
+        # Clean up session - only the technician running it may end it
+        session = self.active_sessions.get(session_id)
+        if session is None or session.tech_id != tech_id:
             return
-            
-        session = self.active_sessions[session_id]
-        client_id = session['client_id']
+        if self.active_sessions.pop(session_id, None) is None:
+            return  # Already pruned
         
-        # Clean up session
-        del self.active_sessions[session_id]
-        
-        if client_id in self.clients:
-            self.clients[client_id]['session_id'] = None
+        client_info = self.clients.get(session.client_id)
+        if client_info:
+            client_info.session_id = None
+            self._dirty_clients.append(session.client_id)
             
-        if tech_id in self.technicians:
-            self.technicians[tech_id]['assigned_client'] = None
+        tech_info = self.technicians.get(session.tech_id)
+        if tech_info:
+            tech_info.assigned_client = None
+            tech_info.session_id = None
+            self._dirty_techs.append(session.tech_id)
             
         self.log(f"Session {session_id} ended by technician")
         
     def broadcast_to_technicians(self, message, exclude_tech=None):
         """Broadcast a message to all connected technicians."""
-        for tech_id, tech_info in list(self.technicians.items()):
+        # Encode once and send the same bytes to every technician
+        self.broadcast_frame(protocol_utils.encode_message(message), exclude_tech)
+        
+    def broadcast_frame(self, frame, exclude_tech=None):
+        """Broadcast an already encoded frame to all connected technicians."""
+        for tech_id, tech_info in self._tech_snapshot:
             if exclude_tech and tech_id == exclude_tech:
                 continue
                 
             try:
-                tech_info['socket'].send(json.dumps(message).encode('utf-8'))
+                self._send_frame(tech_info, frame, wake=False)
             except Exception as e:
                 self.log(f"Error broadcasting to technician {tech_id}: {str(e)}")
                 self.disconnect_technician(tech_id)
                 
+        # One wakeup flushes every queued copy in a single selector pass
+        if threading.get_ident() != self._io_thread_ident:
+            self._wake_io()
+            
     def disconnect_client(self, client_id):
         """Disconnect a client."""
-        if client_id not in self.clients:
-            return
-            
-        client_info = self.clients[client_id]
+        # Remove first so a concurrent disconnect of the same client is a no-op
+        with self._clients_lock:
+            client_info = self.clients.pop(client_id, None)
+            if client_info is None:
+                return
+        self._dirty_clients.append(client_id)
         
         # End any active session
-        session_id = client_info.get('session_id')
-        if session_id and session_id in self.active_sessions:
-            del self.active_sessions[session_id]
-            
-            # Notify technician
-            session = self.active_sessions.get(session_id, {})
-            tech_id = session.get('tech_id')
-            if tech_id in self.technicians:
-                self.technicians[tech_id]['assigned_client'] = None
+        session = self.active_sessions.pop(client_info.session_id, None)
+        if session:
+            # Free the technician
+            tech_info = self.technicians.get(session.tech_id)
+            if tech_info:
+                tech_info.assigned_client = None
+                tech_info.session_id = None
+                self._dirty_techs.append(session.tech_id)
                 
         # Remove help request
         if client_id in self.help_requests:
             del self.help_requests[client_id]
             
-        # Close socket
+        # Stop watching and close socket
+        self._unregister(client_info.socket)
         try:
-            client_info['socket'].close()
-        except:
+            client_info.socket.close()
+        except OSError:
             pass
             
-        # Remove from clients
-        del self.clients[client_id]
-        
-        self.log(f"Client '{client_info['name']}' disconnected")
+        self.log(f"Client '{client_info.name}' disconnected")
         
         # Notify technicians
-        disconnect_notification = {
-            'type': 'client_disconnected',
-            'client_id': client_id
-        }
-        self.broadcast_to_technicians(disconnect_notification)
+        self.broadcast_frame(client_notice_frame('client_disconnected', client_id))
         
     def disconnect_technician(self, tech_id):
         """Disconnect a technician."""
-        if tech_id not in self.technicians:
-            return
-            
-        tech_info = self.technicians[tech_id]
-        
-        # End any active session
-        assigned_client = tech_info.get('assigned_client')
-        if assigned_client and assigned_client in self.clients:
-            # Find and end session
-            for session_id, session in list(self.active_sessions.items()):
-                if session['tech_id'] == tech_id:
-                    del self.active_sessions[session_id]
-                    self.clients[assigned_client]['session_id'] = None
-                    break
+        # Remove first so a concurrent disconnect of the same technician is a no-op
+        with self._techs_lock:
+            tech_info = self.technicians.pop(tech_id, None)
+            if tech_info is None:
+                return
+            self._tech_snapshot = tuple(self.technicians.items())
+        self._dirty_techs.append(tech_id)
+        
+        # End any active session - the technician records its own session id
+        session = self.active_sessions.pop(tech_info.session_id, None)
+        if session:
+            client_info = self.clients.get(session.client_id)
+            if client_info:
+                client_info.session_id = None
+                self._dirty_clients.append(session.client_id)
                     
-        # Close socket
+        # Stop watching and close socket
+        self._unregister(tech_info.socket)
         try:
-            tech_info['socket'].close()
-        except:
+            tech_info.socket.close()
+        except OSError:
             pass
             
-        # Remove from technicians
-        del self.technicians[tech_id]
-        
-        self.log(f"Technician '{tech_info['name']}' disconnected")
-        
-    def heartbeat_checker(self):
-        """Check for disconnected clients and technicians."""
-        while self.running:
-            time.sleep(HEARTBEAT_INTERVAL)
-            
-            # Check clients
-            for client_id in list(self.clients.keys()):
-                try:
-                    heartbeat = {'type': 'heartbeat'}
-                    self.clients[client_id]['socket'].send(json.dumps(heartbeat).encode('utf-8'))
-                except:
-                    self.disconnect_client(client_id)
-                    
-            # Check technicians
-            for tech_id in list(self.technicians.keys()):
-                try:
-                    heartbeat = {'type': 'heartbeat'}
-                    self.technicians[tech_id]['socket'].send(json.dumps(heartbeat).encode('utf-8'))
-                except:
-                    self.disconnect_technician(tech_id)
-                    
+        self.log(f"Technician '{tech_info.name}' disconnected")
+        
+    def _prune_stale_state(self):
+        """Drop expired help requests and sessions whose peers are gone."""
+        expired = time.monotonic() - HELP_REQUEST_TTL
+        
+        for client_id, request in list(self.help_requests.items()):
+            client_info = self.clients.get(client_id)
+            if client_info is None:
+                self.help_requests.pop(client_id, None)
+            elif request['ts_mono'] < expired:
+                self.help_requests.pop(client_id, None)
+                client_info.help_requested = False
+                self._dirty_clients.append(client_id)
+                self.log(f"Help request from client {client_id} expired")
+                self.broadcast_frame(client_notice_frame('help_cancelled', client_id))
+                
+        for session_id, session in list(self.active_sessions.items()):
+            if session.client_id not in self.clients or session.tech_id not in self.technicians:
+                self.active_sessions.pop(session_id, None)
+                
     def update_gui(self):
         """Update the GUI with current status."""
+        # Write queued log lines
+        self._update_log_gui()
+        
         if not self.running:
-            self.root.after(5000, self.update_gui)
+            self.root.after(GUI_UPDATE_MS, self.update_gui)
             return
             
         # Update statistics
@@ -989,43 +1323,78 @@ class MediatorServer:
         self.requests_count_label.config(text=str(len(self.help_requests)))
         self.sessions_count_label.config(text=str(len(self.active_sessions)))
         
-        # Update clients tree
-        for item in self.clients_tree.get_children():
-            self.clients_tree.delete(item)
-            
-        for client_id, client_info in self.clients.items():
-            status = "Requesting Help" if client_info['help_requested'] else "In Session" if client_info['session_id'] else "Connected"
-            connected_time = client_info['connected_time'].strftime("%H:%M:%S")
-            
-            self.clients_tree.insert("", "end", iid=client_id, text=client_id,
-                                   values=(client_info['ip'], client_info['name'], status, connected_time))
-                                   
-        # Update technicians tree
-        for item in self.techs_tree.get_children():
-            self.techs_tree.delete(item)
-            
-        for tech_id, tech_info in self.technicians.items():
-            status = "In Session" if tech_info['assigned_client'] else "Available"
-            connected_time = tech_info['connected_time'].strftime("%H:%M:%S")
-            
-            self.techs_tree.insert("", "end", iid=tech_id, text=tech_id,
-                                 values=(tech_info['ip'], tech_info['name'], status, connected_time))
-                                 
-        # Update sessions tree
-        for item in self.sessions_tree.get_children():
-            self.sessions_tree.delete(item)
-            
-        for session_id, session in self.active_sessions.items():
-            client_name = self.clients.get(session['client_id'], {}).get('name', 'Unknown')
-            tech_name = self.technicians.get(session['tech_id'], {}).get('name', 'Unknown')
-            start_time = session['start_time'].strftime("%H:%M:%S")
-            duration = str(datetime.now() - session['start_time']).split('.')[0]
-            
-            self.sessions_tree.insert("", "end", iid=session_id, text=session_id,
-                                    values=(client_name, tech_name, start_time, duration))
-                                    
+        # Only peers that changed since the last update are redrawn
+        self._redraw_rows(self.clients_tree, 'clients', self._dirty_clients, self.clients, self._client_row)
+        self._redraw_rows(self.techs_tree, 'techs', self._dirty_techs, self.technicians, self._tech_row)
+        
+        # Update sessions tree - durations change every tick
+        sessions = {}
+        now = datetime.now()
+        for session_id, session in list(self.active_sessions.items()):
+            client_info = self.clients.get(session.client_id)
+            tech_info = self.technicians.get(session.tech_id)
+            client_name = client_info.name if client_info else 'Unknown'
+            tech_name = tech_info.name if tech_info else 'Unknown'
+            elapsed = int((now - session.start_time).total_seconds())
+            duration = f"{elapsed // 3600:02d}:{elapsed // 60 % 60:02d}:{elapsed % 60:02d}"
+            sessions[session_id] = (client_name, tech_name, session.start_label, duration)
+            
+        self._sync_tree(self.sessions_tree, 'sessions', sessions)
+        
         # Schedule next update
-        self.root.after(2000, self.update_gui)
+        self.root.after(GUI_UPDATE_MS, self.update_gui)
+        
+    def _client_row(self, client_info):
+        """Build the clients tree row for a client."""
+        status = "Requesting Help" if client_info.help_requested else "In Session" if client_info.session_id else "Connected"
+        return (client_info.ip, client_info.name, status, client_info.connected_label)
+        
+    def _tech_row(self, tech_info):
+        """Build the technicians tree row for a technician."""
+        status = "In Session" if tech_info.assigned_client else "Available"
+        return (tech_info.ip, tech_info.name, status, tech_info.connected_label)
+        
+    def _redraw_rows(self, tree, name, dirty, peers, make_row):
+        """Redraw the rows of peers marked dirty, deleting those that have left."""
+        changed = set()
+        while dirty:
+            changed.add(dirty.popleft())
+            
+        last = self._last_render[name]
+        dead = []
+        for iid in changed:
+            peer = peers.get(iid)
+            if peer is None:
+                if last.pop(iid, None) is not None:
+                    dead.append(iid)
+                continue
+                
+            values = make_row(peer)
+            if iid not in last:
+                tree.insert("", "end", iid=iid, text=iid, values=values)
+            elif values != last[iid]:
+                tree.item(iid, values=values)
+            last[iid] = values
+            
+        # One Tcl call removes every departed row
+        if dead:
+            tree.delete(*dead)
+            
+    def _sync_tree(self, tree, name, rows):
+        """Apply only the rows that changed since the tree was last drawn."""
+        last = self._last_render[name]
+        
+        dead = last.keys() - rows.keys()
+        if dead:
+            tree.delete(*dead)
+            
+        for iid, values in rows.items():
+            if iid not in last:
+                tree.insert("", "end", iid=iid, text=iid, values=values)
+            elif values != last[iid]:
+                tree.item(iid, values=values)
+                
+        self._last_render[name] = rows
         
     def on_close(self):
         """Handle window close."""
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Message Framing Utilities for Remote Control System
+Length-prefixed JSON messages between the mediator, clients and technicians.
+"""
+
+import json
+import queue
+import socket
+import struct
+
+# orjson is much faster on small messages; fall back to the standard library
+try:
+    import orjson
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+    HAVE_ORJSON = True
+except ImportError:
+    HAVE_ORJSON = False
+    # Compact UTF-8 output like orjson's, from one encoder built up front
+    _encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+    def _dumps(message):
+        return _encoder.encode(message).encode('utf-8')
+    def _loads(data):
+        return json.loads(bytes(data) if isinstance(data, memoryview) else data)
+
+# Every message is a 4-byte big-endian payload length followed by UTF-8 JSON
+HEADER = struct.Struct("!I")
+HEADER_SIZE = HEADER.size
+MAX_MESSAGE_SIZE = 1024 * 1024
+
+# Screenshots from client to technician: the same length header, then the
+# pixel format, image size and cursor position, then the pixels themselves
+SCREEN_HEADER = struct.Struct("!BHHii")
+SCREEN_JPEG = 0
+SCREEN_RAW_RGB = 1
+SCREEN_RAW_BGRA = 2  # Packed rows of 4-byte pixels, as mss captures them
+SCREEN_UNCHANGED = 3  # Same picture as the last frame - only the cursor, no pixels
+
+def frame_payload(payload):
+    """Prefix already encoded payload bytes with the length header."""
+    return HEADER.pack(len(payload)) + payload
+
+def encode_message(message):
+    """Encode a message as a length-prefixed frame."""
+    return frame_payload(_dumps(message))
+
+def _is_plain(value):
+    """True for strings that can go into a JSON template without escaping."""
+    return (isinstance(value, str) and value.isascii() and value.isprintable()
+            and '"' not in value and '\\' not in value)
+
+def encode_template(template, message):
+    """Encode a fixed-shape message by formatting its JSON template."""
+    # orjson is faster than formatting, and anything needing escapes must
+    # go through a real encoder - templates only pay off on the json fallback
+    if HAVE_ORJSON or not all(_is_plain(value) for value in message.values()):
+        return encode_message(message)
+    return frame_payload(template.format_map(message).encode('ascii'))
+
+def encode_screenshot(fmt, size, cursor, pixels):
+    """Encode a screenshot as a length-prefixed binary frame."""
+    header = SCREEN_HEADER.pack(fmt, size[0], size[1], cursor[0], cursor[1])
+    return HEADER.pack(len(header) + len(pixels)) + header + pixels
+
+def send_message(sock, message):
+    """Send a message over a blocking socket."""
+    sock.sendall(encode_message(message))
+
+def recv_exact(sock, view):
+    """Fill a memoryview from a blocking socket, False if the peer closed first."""
+    while view:
+        received = sock.recv_into(view)
+        if not received:
+            return False
+        view = view[received:]
+    return True
+
+def recv_message(sock, buffer=None):
+    """Receive one message from a blocking socket, None if the peer closed."""
+    # The header can go into the front of the caller's buffer before the payload
+    header = buffer if buffer is not None and len(buffer) >= HEADER_SIZE else bytearray(HEADER_SIZE)
+    view = memoryview(header)[:HEADER_SIZE]
+    received = sock.recv_into(view)  # A timeout here just means the peer is idle
+    if not received:
+        return None
+        
+    # Once part of a frame is in, a timeout would leave the stream misaligned
+    try:
+        if not recv_exact(sock, view[received:]):
+            return None
+            
+        length = HEADER.unpack_from(header)[0]
+        if length > MAX_MESSAGE_SIZE:
+            raise ValueError(f"Message too large: {length} bytes")
+            
+        # Reuse the caller's buffer when one is given and the message fits
+        if buffer is None or len(buffer) < length:
+            buffer = bytearray(length)
+        if not recv_exact(sock, memoryview(buffer)[:length]):
+            return None
+    except socket.timeout:
+        raise ConnectionError("Timed out in the middle of a message")
+        
+    with memoryview(buffer) as view:
+        return _loads(view[:length])
+
+def parse_messages(buf):
+    """Pop every complete frame off the front of a receive buffer and decode it."""
+    messages = []
+    offset = 0
+    
+    # Decode each payload in place; the views are released before the buffer shrinks
+    with memoryview(buf) as view:
+        while len(buf) - offset >= HEADER_SIZE:
+            length = HEADER.unpack_from(buf, offset)[0]
+            if length > MAX_MESSAGE_SIZE:
+                raise ValueError(f"Message too large: {length} bytes")
+                
+            end = offset + HEADER_SIZE + length
+            if end > len(buf):
+                break  # Wait for the rest of the frame
+                
+            with view[offset + HEADER_SIZE:end] as payload:
+                messages.append(_loads(payload))
+            offset = end
+            
+    del buf[:offset]
+    return messages
+
+class BufferPool:
+    """Free list of reusable receive buffers."""
+    
+    def __init__(self, size, count):
+        self.size = size
+        self._free = queue.LifoQueue()
+        for _ in range(count):
+            self._free.put(bytearray(size))
+            
+    def acquire(self):
+        """Take a buffer from the pool, allocating one if it is empty."""
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            return bytearray(self.size)
+            
+    def release(self, buf):
+        """Return a buffer to the pool."""
+        self._free.put(buf)
@@ -10,7 +10,7 @@ import os
 from cryptography import x509
 from cryptography.x509.oid import NameOID
 from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.asymmetric import ec
 from cryptography.hazmat.primitives import serialization
 import datetime
 import ipaddress
@@ -22,13 +22,17 @@ class SSLManager:
         self.ca_cert_file = "ca.crt"
         self.ca_key_file = "ca.key"
         
+        # Contexts are built once and shared by every socket they wrap
+        self._server_context = None
+        self._client_context = None
+        
+        # Last TLS session per (host, port), resumed on the next connection
+        self.client_sessions = {}
+        
     def generate_ca_certificate(self):
         """Generate a Certificate Authority (CA) certificate."""
-        # Generate private key for CA
-        ca_key = rsa.generate_private_key(
-            public_exponent=65537,
-            key_size=2048,
-        )
+        # Generate private key for CA (P-256 is far quicker to generate than RSA)
+        ca_key = ec.generate_private_key(ec.SECP256R1())
         
         # Create CA certificate
         subject = issuer = x509.Name([
@@ -62,7 +66,7 @@ class SSLManager:
             critical=True,
         ).add_extension(
             x509.KeyUsage(
-                key_encipherment=True,
+                key_encipherment=False,
                 digital_signature=True,
                 key_agreement=False,
                 key_cert_sign=True,
@@ -94,10 +98,7 @@ class SSLManager:
             ca_cert, ca_key = self.load_ca_certificate()
             
         # Generate private key for server
-        server_key = rsa.generate_private_key(
-            public_exponent=65537,
-            key_size=2048,
-        )
+        server_key = ec.generate_private_key(ec.SECP256R1())
         
         # Create server certificate
         subject = x509.Name([
@@ -130,13 +131,13 @@ class SSLManager:
             critical=False,
         ).add_extension(
             x509.KeyUsage(
-                key_encipherment=True,
+                key_encipherment=False,  # ECDHE key exchange, no RSA key transport
                 digital_signature=True,
                 key_agreement=False,
                 key_cert_sign=False,
                 crl_sign=False,
                 content_commitment=False,
-                data_encipherment=True,
+                data_encipherment=False,
                 encipher_only=False,
                 decipher_only=False,
             ),
@@ -155,6 +156,7 @@ class SSLManager:
                     encryption_algorithm=serialization.NoEncryption()
                 ))
             print(f"✅ Server certificate and key saved: {self.cert_file}, {self.key_file}")
+            self._server_context = None  # Pick up the new certificate on the next wrap
         except Exception as e:
             print(f"❌ Error saving server certificate: {e}")
             raise
@@ -187,10 +189,14 @@ class SSLManager:
         print("✅ SSL certificates ready!")
         
     def create_server_context(self):
-        """Create SSL context for server."""
+        """Create SSL context for server, reusing the one already built."""
+        if self._server_context is not None:
+            return self._server_context
+            
         context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
         context.check_hostname = False
         context.verify_mode = ssl.CERT_NONE  # For internal network use
+        self._harden_context(context)
         
         try:
             context.load_cert_chain(self.cert_file, self.key_file)
@@ -199,25 +205,39 @@ class SSLManager:
             self.setup_certificates()
             context.load_cert_chain(self.cert_file, self.key_file)
             
+        self._server_context = context
         return context
         
     def create_client_context(self):
-        """Create SSL context for client."""
+        """Create SSL context for client, reusing the one already built."""
+        if self._client_context is not None:
+            return self._client_context
+            
         context = ssl.create_default_context()
         context.check_hostname = False
         context.verify_mode = ssl.CERT_NONE  # For internal network use
+        self._harden_context(context)
         
+        self._client_context = context
         return context
         
-    def wrap_server_socket(self, sock):
+    def _harden_context(self, context):
+        """Require TLS 1.3 and keep session tickets on for cheap reconnects."""
+        # TLS 1.3 only offers AEAD suites, so no cipher list is needed
+        context.minimum_version = ssl.TLSVersion.TLSv1_3
+        context.options |= ssl.OP_NO_COMPRESSION
+        context.options &= ~ssl.OP_NO_TICKET
+        
+    def wrap_server_socket(self, sock, handshake_on_accept=True):
         """Wrap a server socket with SSL."""
         context = self.create_server_context()
-        return context.wrap_socket(sock, server_side=True)
+        return context.wrap_socket(sock, server_side=True,
+                                   do_handshake_on_connect=handshake_on_accept)
         
-    def wrap_client_socket(self, sock, server_hostname="localhost"):
-        """Wrap a client socket with SSL."""
+    def wrap_client_socket(self, sock, server_hostname="localhost", session=None):
+        """Wrap a client socket with SSL, resuming session if one is given."""
         context = self.create_client_context()
-        return context.wrap_socket(sock, server_hostname=server_hostname)
+        return context.wrap_socket(sock, server_hostname=server_hostname, session=session)
 
 # Global SSL manager instance
 ssl_manager = SSLManager()
@@ -231,12 +251,16 @@ def initialize_ssl():
         print(f"❌ Failed to initialize SSL: {e}")
         return False
 
-def create_secure_server_socket(host, port):
+def create_secure_server_socket(host, port, reuse_port=False, handshake_on_accept=True):
     """Create a secure server socket."""
     sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        # Let several listeners bind the same port
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
     sock.bind((host, port))
-    return ssl_manager.wrap_server_socket(sock)
+    # Without handshake_on_accept, whoever accepts must call do_handshake()
+    return ssl_manager.wrap_server_socket(sock, handshake_on_accept)
 
 def create_secure_client_socket():
     """Create a secure client socket."""
@@ -246,4 +270,14 @@ def create_secure_client_socket():
 def connect_secure_client(sock, host, port):
     """Connect a client socket securely."""
     sock.connect((host, port))
-    return ssl_manager.wrap_client_socket(sock, server_hostname=host) 
\ No newline at end of file
+    # Every channel carries small interactive messages - don't let Nagle hold them
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    session = ssl_manager.client_sessions.get((host, port))
+    return ssl_manager.wrap_client_socket(sock, server_hostname=host, session=session)
+
+def remember_session(sock, host, port):
+    """Keep a connection's TLS session so the next connect to host:port can resume it."""
+    # TLS 1.3 tickets arrive after the handshake, so call this once something was read
+    session = sock.session
+    if session is not None and session.has_ticket:
+        ssl_manager.client_sessions[(host, port)] = session 
\ No newline at end of file
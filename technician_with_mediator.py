@@ -6,28 +6,38 @@ It connects to the mediator server to see help requests and manage control sessi
 """
 
 import socket
+import selectors
+import ssl
 import threading
-import time
-import pickle
-import base64
+import queue
 import io
+import ipaddress
 import logging
+import logging.handlers
+from concurrent.futures import ThreadPoolExecutor
+import atexit
 import sys
-import json
-from PIL import Image, ImageTk, ImageDraw
+from PIL import Image, ImageTk
 import tkinter as tk
 from tkinter import messagebox, simpledialog, scrolledtext, ttk
 import ssl_utils
+import protocol_utils
 
-# Setup logging
+# Setup logging - records are only queued by the caller; the file and
+# console writes happen on the listener's own thread
+_log_queue = queue.Queue(-1)
+_log_listener = logging.handlers.QueueListener(
+    _log_queue,
+    logging.FileHandler("technician_log.txt"),
+    logging.StreamHandler(sys.stdout)
+)
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("technician_log.txt"),
-        logging.StreamHandler(sys.stdout)
-    ]
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
 )
+_log_listener.start()
+atexit.register(_log_listener.stop)  # Flush what is still queued on exit
 logger = logging.getLogger("RemoteControlTechnician")
 
 # Configuration
@@ -35,16 +45,72 @@ MEDIATOR_PORT = 5556
 REMOTE_CONTROL_PORT = 5555
 BUFFER_SIZE = 8192
 SOCKET_TIMEOUT = 30
+CONTROL_RCVBUF = 4 << 20  # Kernel receive buffer for the screenshot stream (a raw 1080p frame is ~6 MB)
+MOUSE_MOVE_INTERVAL = 16  # ms between mouse_move commands (~60 Hz)
+KEEPALIVE_IDLE = 5  # Idle seconds on the control connection before keepalive probes
+KEEPALIVE_PROBE_INTERVAL = 3
+KEEPALIVE_PROBES = 3
+CURSOR_SIZE = 10  # Half-length of the remote cursor crosshair, in canvas pixels
+RESIZE_FILTER = Image.BILINEAR  # Frames are a live preview; LANCZOS costs several times more
+
+# Tk keysyms to pyautogui key names; modifiers are matched lowercased
+KEY_MAP = {
+    'Return': 'enter',
+    'Tab': 'tab',
+    'BackSpace': 'backspace',
+    'Delete': 'delete',
+    'Escape': 'escape',
+    'space': 'space',
+    'Up': 'up',
+    'Down': 'down',
+    'Left': 'left',
+    'Right': 'right',
+    'Home': 'home',
+    'End': 'end',
+    'Page_Up': 'pageup',
+    'Page_Down': 'pagedown',
+    'F1': 'f1', 'F2': 'f2', 'F3': 'f3', 'F4': 'f4',
+    'F5': 'f5', 'F6': 'f6', 'F7': 'f7', 'F8': 'f8',
+    'F9': 'f9', 'F10': 'f10', 'F11': 'f11', 'F12': 'f12',
+    'control_l': 'ctrl', 'control_r': 'ctrl',
+    'alt_l': 'alt', 'alt_r': 'alt',
+    'shift_l': 'shift', 'shift_r': 'shift',
+    'super_l': 'win', 'super_r': 'win', 'win_l': 'win', 'win_r': 'win'
+}
+
+# Fixed reply, encoded once
+HEARTBEAT_RESPONSE_FRAME = protocol_utils.encode_message({'type': 'heartbeat_response'})
+
+# Per-event commands are formatted straight into JSON bytes - coordinates
+# are ints and the buttons are fixed, so nothing ever needs escaping
+MOUSE_MOVE_FORMAT = b'{"type":"mouse_move","x":%d,"y":%d}'
+LEFT_CLICK_FORMAT = b'{"type":"mouse_click","x":%d,"y":%d,"button":"left"}'
+RIGHT_CLICK_FORMAT = b'{"type":"mouse_click","x":%d,"y":%d,"button":"right"}'
+KEY_PRESS_TEMPLATE = '{{"type":"key_press","key":"{key}"}}'  # See protocol_utils.encode_template
 
 class RemoteControlTechnicianWithMediator:
     def __init__(self, username=None):
+        # Short background jobs such as connecting to a client. The mediator
+        # loop and a session's receive, decode and command loops live as long
+        # as their connection, so each gets its own daemon thread instead
+        self._pool = ThreadPoolExecutor(max_workers=2)
+        
         # Mediator connection
         self.mediator_socket = None
         self.mediator_connected = False
         self.technician_id = None
+        self._mediator_buf = bytearray(BUFFER_SIZE)  # Reused for every mediator message
+        
+        # After the welcome, one IO thread owns the mediator socket; other
+        # threads queue frames in _mediator_tx and poke it through _mediator_wake
+        self._mediator_tx = bytearray()
+        self._mediator_lock = threading.Lock()
+        self._mediator_stop = None
+        self._mediator_wake = None
         
         # Direct control connection
         self.control_socket = None
+        self._commands = None  # Encoded commands waiting for the session's writer
         self.control_connected = False
         self.control_running = False
         self.current_client_ip = None
@@ -56,9 +122,27 @@ class RemoteControlTechnicianWithMediator:
         self.cursor_x = 0
         self.cursor_y = 0
         self.keyboard_focus = False
+        self._target_size = (0, 0)  # Canvas size, kept current by <Configure>
+        self._label_state = {}  # label: (text, fg) last set through _set_label
+        
+        # Mouse motion is coalesced and sent on a timer
+        self._pending_mouse = None
+        self._last_sent_mouse = None
+        self._mouse_flush_scheduled = False
+        
+        # Latest decoded frame waiting for the Tk thread; older ones are overwritten
+        self._next_frame = None
+        self._frame_lock = threading.Lock()
+        self._img_item = None  # The one canvas item every frame is drawn into
+        self._cursor_items = ()  # Crosshair lines kept above it
+        self._photo = None  # The item's PhotoImage, repainted in place while the size holds
         
         # Help requests list
         self.help_requests = {}  # client_id: {name, ip, timestamp}
+        self._shown_requests = {}  # client_id: row values currently in requests_tree
+        self._help_refresh_pending = False
+        
+        self._local_ip = None  # Filled in by the first get_local_ip()
         
         # Store username from login
         self.username = username
@@ -89,6 +173,13 @@ class RemoteControlTechnicianWithMediator:
             'border': '#3a3a5c'
         }
         
+        # Hover shade for each button color that has one
+        self._hover_colors = {
+            self.colors['success']: '#00f0cc',
+            self.colors['error']: '#ff6b6b',
+            self.colors['info']: '#42a5f5'
+        }
+        
         # Configure main window
         self.root.configure(bg=self.colors['primary'])
         
@@ -411,6 +502,7 @@ class RemoteControlTechnicianWithMediator:
         # Bind canvas events
         self.canvas.bind("<Button-1>", self.on_canvas_click)
         self.canvas.bind("<Motion>", self.on_canvas_motion)
+        self.canvas.bind("<Configure>", self.on_canvas_configure)
         self.canvas.bind("<Button-3>", self.on_canvas_right_click)
         self.canvas.bind("<FocusIn>", self.on_canvas_focus_in)
         self.canvas.bind("<FocusOut>", self.on_canvas_focus_out)
@@ -481,16 +573,13 @@ class RemoteControlTechnicianWithMediator:
         )
         btn.pack(fill=tk.X, pady=2)
         
-        # Hover effects
+        # Hover effects - the hover color is looked up once, not per event
+        hover = self._hover_colors.get(color)
+        
         def on_enter(e):
-            if btn['state'] != 'disabled':
-                if color == self.colors['success']:
-                    btn.configure(bg='#00f0cc')
-                elif color == self.colors['error']:
-                    btn.configure(bg='#ff6b6b')
-                elif color == self.colors['info']:
-                    btn.configure(bg='#42a5f5')
-                    
+            if hover and btn['state'] != 'disabled':
+                btn.configure(bg=hover)
+                
         def on_leave(e):
             if btn['state'] != 'disabled':
                 btn.configure(bg=color)
@@ -521,28 +610,33 @@ class RemoteControlTechnicianWithMediator:
         return btn
         
     def get_local_ip(self):
-        """Get the local IP address."""
+        """Get the local IP address, looked up once and then cached."""
+        if self._local_ip is not None:
+            return self._local_ip
+            
         try:
             with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
                 s.connect(("8.8.8.8", 80))
-                return s.getsockname()[0]
+                self._local_ip = s.getsockname()[0]
+                return self._local_ip
         except Exception:
-            return "127.0.0.1"
+            return "127.0.0.1"  # Not cached, so a later call can still find the network
+            
+    def _set_label(self, label, text, fg=None):
+        """Configure a status label, skipping the Tk call if nothing changed."""
+        if self._label_state.get(label) == (text, fg):
+            return
+        self._label_state[label] = (text, fg)
+        if fg is None:
+            label.config(text=text)
+        else:
+            label.config(text=text, fg=fg)
             
     def log(self, message):
         """Add a message to the log."""
-        timestamp = time.strftime("%H:%M:%S")
-        log_message = f"[{timestamp}] {message}"
+        # There is no log widget any more - console and file only
         logger.info(message)
         
-        # Update GUI log
-        self.root.after(0, lambda: self._update_log_gui(log_message))
-        
-    def _update_log_gui(self, message):
-        """Update the GUI log in the main thread."""
-        # Log widget removed - only console logging now
-        pass
-        
     def connect_to_mediator(self):
         """Connect to the mediator server."""
         if self.mediator_connected:
@@ -573,14 +667,14 @@ class RemoteControlTechnicianWithMediator:
                 'ip': self.get_local_ip()
             }
             
-            self.mediator_socket.send(json.dumps(connect_message).encode('utf-8'))
+            protocol_utils.send_message(self.mediator_socket, connect_message)
             
             # Wait for welcome message
-            response = self.mediator_socket.recv(BUFFER_SIZE)
-            welcome_msg = json.loads(response.decode('utf-8'))
+            welcome_msg = protocol_utils.recv_message(self.mediator_socket, self._mediator_buf)
             
-            if welcome_msg['type'] == 'welcome':
+            if welcome_msg and welcome_msg['type'] == 'welcome':
                 self.technician_id = welcome_msg['technician_id']
+                ssl_utils.remember_session(self.mediator_socket, mediator_ip, MEDIATOR_PORT)
                 self.mediator_connected = True
                 
                 # Update help requests
@@ -588,7 +682,7 @@ class RemoteControlTechnicianWithMediator:
                 self.update_help_requests(help_requests)
                 
                 # Update UI
-                self.mediator_status_label.config(text="Connected", fg="green")
+                self._set_label(self.mediator_status_label, "Connected", "green")
                 self.connect_mediator_button.config(state=tk.DISABLED)
                 self.disconnect_mediator_button.config(state=tk.NORMAL)
                 self.request_control_button.config(state=tk.NORMAL)
@@ -596,7 +690,16 @@ class RemoteControlTechnicianWithMediator:
                 self.log(f"Connected to mediator server (Technician ID: {self.technician_id})")
                 
                 # Start handling mediator messages
-                threading.Thread(target=self.handle_mediator_messages, daemon=True).start()
+                self.mediator_socket.setblocking(False)
+                self._mediator_tx = bytearray()
+                self._mediator_stop = threading.Event()
+                self._mediator_wake = socket.socketpair()
+                for wake_sock in self._mediator_wake:
+                    wake_sock.setblocking(False)
+                threading.Thread(target=self.handle_mediator_messages,
+                                 args=(self.mediator_socket, self._mediator_tx,
+                                       self._mediator_stop, self._mediator_wake),
+                                 daemon=True).start()
                 
             else:
                 raise Exception("Invalid welcome message")
@@ -615,15 +718,14 @@ class RemoteControlTechnicianWithMediator:
         """Disconnect from the mediator server."""
         self.mediator_connected = False
         
-        if self.mediator_socket:
-            try:
-                self.mediator_socket.close()
-            except:
-                pass
-            self.mediator_socket = None
+        # The IO thread closes the socket itself once it sees the stop flag
+        if self._mediator_stop is not None:
+            self._mediator_stop.set()
+            self._wake_mediator()
+        self.mediator_socket = None
             
         # Update UI
-        self.mediator_status_label.config(text="Disconnected", fg="red")
+        self._set_label(self.mediator_status_label, "Disconnected", "red")
         self.connect_mediator_button.config(state=tk.NORMAL)
         self.disconnect_mediator_button.config(state=tk.DISABLED)
         self.request_control_button.config(state=tk.DISABLED)
@@ -634,28 +736,97 @@ class RemoteControlTechnicianWithMediator:
         
         self.log("Disconnected from mediator server")
         
-    def handle_mediator_messages(self):
-        """Handle messages from the mediator server."""
+    def handle_mediator_messages(self, sock, tx_buf, stop, wake):
+        """Read and write the mediator socket until stopped or disconnected."""
+        sel = selectors.DefaultSelector()
+        sel.register(sock, selectors.EVENT_READ)
+        sel.register(wake[0], selectors.EVENT_READ)
+        events = selectors.EVENT_READ
+        rx_buf = bytearray()
+        
         try:
-            while self.mediator_connected and self.mediator_socket:
-                try:
-                    data = self.mediator_socket.recv(BUFFER_SIZE)
-                    if not data:
-                        break
-                        
-                    message = json.loads(data.decode('utf-8'))
-                    self.process_mediator_message(message)
-                    
-                except ConnectionError:
-                    break
-                except Exception as e:
-                    self.log(f"Error handling mediator message: {str(e)}")
-                    break
+            while not stop.is_set():
+                for key, mask in sel.select():
+                    if key.fileobj is wake[0]:
+                        try:
+                            wake[0].recv(4096)
+                        except BlockingIOError:
+                            pass
+                    elif mask & selectors.EVENT_READ:
+                        if not self._read_mediator(sock, rx_buf):
+                            return
+                            
+                # Send whatever was queued, and only wait for writability while some is left
+                waiting = self._flush_mediator(sock, tx_buf)
+                wanted = selectors.EVENT_READ | (selectors.EVENT_WRITE if waiting else 0)
+                if wanted != events:
+                    sel.modify(sock, wanted)
+                    events = wanted
                     
+        except OSError:
+            pass  # Connection reset or closed
         except Exception as e:
             self.log(f"Error in mediator message handler: {str(e)}")
         finally:
-            self.disconnect_from_mediator()
+            sel.close()
+            for closing in (sock, *wake):
+                try:
+                    closing.close()
+                except OSError:
+                    pass
+            if not stop.is_set():
+                self.root.after(0, self.disconnect_from_mediator)
+                
+    def _read_mediator(self, sock, rx_buf):
+        """Drain the readable mediator socket, False once the mediator has closed it."""
+        chunk = memoryview(self._mediator_buf)
+        while True:
+            try:
+                received = sock.recv_into(chunk)
+            except (ssl.SSLWantReadError, ssl.SSLWantWriteError, BlockingIOError):
+                break
+            if not received:
+                return False
+            rx_buf += chunk[:received]
+            
+        for message in protocol_utils.parse_messages(rx_buf):
+            try:
+                self.process_mediator_message(message)
+            except Exception as e:
+                self.log(f"Error handling mediator message: {str(e)}")
+        return True
+        
+    def _flush_mediator(self, sock, tx_buf):
+        """Send as much queued output as the socket takes now, returning what is left."""
+        with self._mediator_lock:
+            offset = 0
+            try:
+                with memoryview(tx_buf) as view:
+                    while offset < len(tx_buf):
+                        try:
+                            offset += sock.send(view[offset:])
+                        except (ssl.SSLWantWriteError, ssl.SSLWantReadError, BlockingIOError):
+                            break
+            finally:
+                del tx_buf[:offset]
+            return len(tx_buf)
+            
+    def _send_to_mediator(self, message):
+        """Queue a message for the mediator IO thread."""
+        self._queue_mediator_frame(protocol_utils.encode_message(message))
+        
+    def _queue_mediator_frame(self, frame):
+        """Queue an already encoded frame for the mediator IO thread."""
+        with self._mediator_lock:
+            self._mediator_tx += frame
+        self._wake_mediator()
+        
+    def _wake_mediator(self):
+        """Interrupt the mediator IO thread's select."""
+        try:
+            self._mediator_wake[1].send(b'\0')
+        except (BlockingIOError, OSError, TypeError):
+            pass  # Already pending, already closed, or never connected
             
     def process_mediator_message(self, message):
         """Process a message from the mediator server."""
@@ -681,11 +852,7 @@ class RemoteControlTechnicianWithMediator:
             
         elif msg_type == 'heartbeat':
             # Respond to heartbeat
-            response = {'type': 'heartbeat_response'}
-            try:
-                self.mediator_socket.send(json.dumps(response).encode('utf-8'))
-            except:
-                pass
+            self._queue_mediator_frame(HEARTBEAT_RESPONSE_FRAME)
                 
         else:
             self.log(f"Unknown message type from mediator: {msg_type}")
@@ -699,7 +866,7 @@ class RemoteControlTechnicianWithMediator:
             'timestamp': request['timestamp']
         }
         
-        self.root.after(0, self.refresh_help_requests_ui)
+        self._schedule_help_refresh()
         self.log(f"New help request from {request['name']} ({request['ip']})")
         
     def remove_help_request(self, client_id):
@@ -707,7 +874,7 @@ class RemoteControlTechnicianWithMediator:
         if client_id in self.help_requests:
             client_info = self.help_requests[client_id]
             del self.help_requests[client_id]
-            self.root.after(0, self.refresh_help_requests_ui)
+            self._schedule_help_refresh()
             self.log(f"Help request removed: {client_info['name']}")
             
     def update_help_requests(self, requests_list):
@@ -721,18 +888,32 @@ class RemoteControlTechnicianWithMediator:
                 'timestamp': request['timestamp']
             }
         
-        self.root.after(0, self.refresh_help_requests_ui)
+        self._schedule_help_refresh()
         
+    def _schedule_help_refresh(self):
+        """Fold back-to-back help request changes into one tree refresh."""
+        if not self._help_refresh_pending:
+            self._help_refresh_pending = True
+            self.root.after_idle(self.refresh_help_requests_ui)
+            
     def refresh_help_requests_ui(self):
-        """Refresh the help requests UI."""
-        # Clear existing items
-        for item in self.requests_tree.get_children():
-            self.requests_tree.delete(item)
+        """Refresh the help requests UI, touching only rows that changed."""
+        self._help_refresh_pending = False
+        rows = {client_id: (request['name'], request['ip'])
+                for client_id, request in dict(self.help_requests).items()}
+        shown = self._shown_requests
+        
+        dead = shown.keys() - rows.keys()
+        if dead:
+            self.requests_tree.delete(*dead)
             
-        # Add current help requests
-        for client_id, request in self.help_requests.items():
-            self.requests_tree.insert("", "end", iid=client_id, text=client_id,
-                                    values=(request['name'], request['ip']))
+        for client_id, values in rows.items():
+            if client_id not in shown:
+                self.requests_tree.insert("", "end", iid=client_id, text=client_id, values=values)
+            elif values != shown[client_id]:
+                self.requests_tree.item(client_id, values=values)
+                
+        self._shown_requests = rows
                                     
     def request_control(self):
         """Request control of the selected client."""
@@ -754,7 +935,7 @@ class RemoteControlTechnicianWithMediator:
                 'client_id': client_id
             }
             
-            self.mediator_socket.send(json.dumps(control_request).encode('utf-8'))
+            self._send_to_mediator(control_request)
             self.log(f"Requesting control of client: {client_info['name']} ({client_info['ip']})")
             
         except Exception as e:
@@ -773,7 +954,7 @@ class RemoteControlTechnicianWithMediator:
         self.log(f"Control approved by {client_name} - connecting to {client_ip}...")
         
         # Connect to client directly
-        threading.Thread(target=self.connect_to_client, args=(client_ip,), daemon=True).start()
+        self._pool.submit(self.connect_to_client, client_ip)
         
     def handle_control_denied(self, message):
         """Handle control denial from client."""
@@ -786,22 +967,40 @@ class RemoteControlTechnicianWithMediator:
         try:
             # Create secure connection to client
             self.control_socket = ssl_utils.create_secure_client_socket()
+            # Set before connecting so the TCP window can scale up to it
+            self.control_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, CONTROL_RCVBUF)
+            self._enable_keepalive(self.control_socket)
             self.control_socket = ssl_utils.connect_secure_client(self.control_socket, client_ip, REMOTE_CONTROL_PORT)
             self.control_socket.settimeout(SOCKET_TIMEOUT)
             
+            # Commands are written by one thread, which sends everything
+            # that piled up since its last write in one go
+            self._commands = queue.SimpleQueue()
+            threading.Thread(target=self._send_commands, args=(self.control_socket, self._commands),
+                             daemon=True).start()
+            
             self.control_connected = True
             self.control_running = True
             
             self.log(f"🔐 Securely connected to client at {client_ip}:{REMOTE_CONTROL_PORT} with SSL encryption")
             
+            # Raw frames beat JPEG decoding on a LAN but would swamp a WAN link
+            self.send_command({
+                'type': 'screen_format',
+                'raw_rgb': ipaddress.ip_address(client_ip).is_private
+            })
+            
             # Update UI
             self.root.after(0, self._update_ui_connected)
             
-            # Start receiving screenshots
-            threading.Thread(target=self._receive_screenshots, daemon=True).start()
-            
-            # Start ping thread
-            threading.Thread(target=self._ping_thread, daemon=True).start()
+            # Start receiving screenshots; a second thread decodes them so the
+            # socket keeps draining while a frame is being decoded. Only the
+            # newest frame is kept, so stale ones are never decoded. Raw frame
+            # buffers come back through spares to be received into again
+            frames = queue.Queue(maxsize=1)
+            spares = queue.Queue(maxsize=2)
+            threading.Thread(target=self._receive_screenshots, args=(frames, spares), daemon=True).start()
+            threading.Thread(target=self._decode_screenshots, args=(frames, spares), daemon=True).start()
             
         except Exception as e:
             self.log(f"❌ Failed to establish secure connection to client {client_ip}: {str(e)}")
@@ -810,189 +1009,291 @@ class RemoteControlTechnicianWithMediator:
             
     def _update_ui_connected(self):
         """Update UI when connected to client."""
-        self.control_status_label.config(text="Connected", fg="green")
-        self.session_status_label.config(text="Active Session", fg="green")
-        self.current_client_label.config(text=self.current_client_ip, fg="green")
+        self._set_label(self.control_status_label, "Connected", "green")
+        self._set_label(self.session_status_label, "Active Session", "green")
+        self._set_label(self.current_client_label, self.current_client_ip, "green")
         self.enable_keyboard_button.config(state=tk.NORMAL)
         self.end_session_button.config(state=tk.NORMAL)
         self.keyboard_focus = True
-        self.keyboard_label.config(text="Enabled", fg="green")
+        self._set_label(self.keyboard_label, "Enabled", "green")
         self.canvas.focus_set()
         
+        # Frames replace this item's image rather than adding canvas items,
+        # and the crosshair lines are moved rather than drawn into each frame
+        self.canvas.delete("all")
+        self._img_item = self.canvas.create_image(0, 0, anchor=tk.NW)
+        self._cursor_items = tuple(
+            self.canvas.create_line(0, 0, 0, 0, fill="red", width=2) for _ in range(2))
+        
         self.log("Connected to client successfully!")
         
     def _update_ui_disconnected(self):
         """Update UI when disconnected from client."""
-        self.control_status_label.config(text="Disconnected", fg="red")
-        self.session_status_label.config(text="No Session", fg="red")
-        self.current_client_label.config(text="None", fg="gray")
+        self._set_label(self.control_status_label, "Disconnected", "red")
+        self._set_label(self.session_status_label, "No Session", "red")
+        self._set_label(self.current_client_label, "None", "gray")
         self.enable_keyboard_button.config(state=tk.DISABLED)
         self.end_session_button.config(state=tk.DISABLED)
         self.keyboard_focus = False
-        self.keyboard_label.config(text="Disabled", fg="red")
-        self.mouse_pos_label.config(text="(0, 0)")
+        self._set_label(self.keyboard_label, "Disabled", "red")
+        self._set_label(self.mouse_pos_label, "(0, 0)")
         self.canvas.delete("all")
-        
-    def _ping_thread(self):
-        """Send ping messages to keep connection alive."""
-        consecutive_failures = 0
-        max_failures = 3
-        
-        while self.control_running and self.control_connected:
-            try:
-                success = self.send_command({'type': 'ping'})
-                if success:
-                    consecutive_failures = 0
-                else:
-                    consecutive_failures += 1
-                    self.log(f"Ping failed ({consecutive_failures}/{max_failures})")
-                    if consecutive_failures >= max_failures:
-                        self.log("Too many ping failures - disconnecting")
-                        break
-                    
-                time.sleep(3)
-                
-            except Exception as e:
-                self.log(f"Ping error: {str(e)}")
-                break
+        self._img_item = None
+        self._cursor_items = ()
+        self._photo = None
+        
+    def _enable_keepalive(self, sock):
+        """Let the kernel probe an idle control connection so a dead link surfaces as an error."""
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        for option, value in (('TCP_KEEPIDLE', KEEPALIVE_IDLE),
+                              ('TCP_KEEPINTVL', KEEPALIVE_PROBE_INTERVAL),
+                              ('TCP_KEEPCNT', KEEPALIVE_PROBES)):
+            if hasattr(socket, option):  # Not every platform exposes all three
+                sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
                 
-        if self.control_connected:
-            self.disconnect_from_client()
-            
-    def _receive_screenshots(self):
-        """Receive and display screenshots from the client."""
+    def _receive_screenshots(self, frames, spares):
+        """Receive screenshots from the client and queue them for decoding."""
+        header = bytearray(protocol_utils.HEADER_SIZE)  # Reused for every frame
+        
         try:
             while self.control_running and self.control_connected:
                 try:
                     # Receive size first (4 bytes)
-                    size_bytes = self._recv_all(4)
-                    if not size_bytes:
+                    if not self._recv_all(protocol_utils.HEADER_SIZE, header):
                         break
                         
-                    size = int.from_bytes(size_bytes, byteorder='big')
+                    size = protocol_utils.HEADER.unpack_from(header)[0]
                     
-                    # Receive data
-                    data = self._recv_all(size)
+                    # Receive data, into the last raw frame's buffer if it fits
+                    try:
+                        spare = spares.get_nowait()
+                    except queue.Empty:
+                        spare = None
+                    data = self._recv_all(size, spare)
                     if not data:
                         break
+                    if spare is not None and data is not spare:
+                        try:
+                            spares.put_nowait(spare)  # Not this frame's size - keep it for the next
+                        except queue.Full:
+                            pass
                         
-                    # Process data
-                    data_packet = pickle.loads(data)
-                    
-                    # Extract image and cursor position
-                    img_b64 = data_packet['image']
-                    self.cursor_x = data_packet['cursor_x']
-                    self.cursor_y = data_packet['cursor_y']
-                    
-                    # Update mouse position
-                    self.root.after(0, lambda: self.mouse_pos_label.config(
-                        text=f"({self.cursor_x}, {self.cursor_y})"))
-                    
-                    # Convert and display image
-                    img_bytes = base64.b64decode(img_b64)
-                    image = Image.open(io.BytesIO(img_bytes))
-                    
-                    # Calculate scaling
-                    canvas_width = self.canvas.winfo_width()
-                    canvas_height = self.canvas.winfo_height()
-                    
-                    if canvas_width > 1 and canvas_height > 1:
-                        img_width, img_height = image.size
-                        self.scale_factor_x = canvas_width / img_width
-                        self.scale_factor_y = canvas_height / img_height
-                        scale = min(self.scale_factor_x, self.scale_factor_y)
-                        
-                        if scale < 1:
-                            new_width = int(img_width * scale)
-                            new_height = int(img_height * scale)
-                            image = image.resize((new_width, new_height), Image.LANCZOS)
-                            self.scale_factor_x = scale
-                            self.scale_factor_y = scale
-                    
-                    # Draw cursor
-                    draw = ImageDraw.Draw(image)
-                    cursor_x_scaled = int(self.cursor_x * self.scale_factor_x)
-                    cursor_y_scaled = int(self.cursor_y * self.scale_factor_y)
-                    
-                    cursor_size = 10
-                    draw.line((cursor_x_scaled - cursor_size, cursor_y_scaled, 
-                              cursor_x_scaled + cursor_size, cursor_y_scaled), 
-                              fill="red", width=2)
-                    draw.line((cursor_x_scaled, cursor_y_scaled - cursor_size, 
-                              cursor_x_scaled, cursor_y_scaled + cursor_size), 
-                              fill="red", width=2)
-                    
-                    # Display image
-                    photo = ImageTk.PhotoImage(image)
-                    self.canvas.delete("all")
-                    self.canvas.create_image(0, 0, image=photo, anchor=tk.NW)
-                    self.canvas.image = photo
+                    self._queue_frame(frames, spares, data)
                     
                 except ConnectionError:
                     break
                 except Exception as e:
-                    self.log(f"Error receiving screenshot: {str(e)}")
+                    if self.control_connected:  # Not just our own disconnect waking the read
+                        self.log(f"Error receiving screenshot: {str(e)}")
                     break
                     
         except Exception as e:
             self.log(f"Error in screenshot thread: {str(e)}")
         finally:
+            self._queue_frame(frames, spares, None)  # Stop the decode thread
             self.disconnect_from_client()
             
-    def _recv_all(self, n):
-        """Receive exactly n bytes."""
-        data = bytearray()
-        while len(data) < n:
+    def _queue_frame(self, frames, spares, data):
+        """Queue a frame for decoding, replacing one that was not decoded yet."""
+        header = protocol_utils.SCREEN_HEADER
+        while True:
             try:
-                packet = self.control_socket.recv(n - len(data))
-                if not packet:
-                    return None
-                data.extend(packet)
-            except socket.timeout:
-                return None
-            except ConnectionError:
+                frames.put_nowait(data)
+                return
+            except queue.Full:
+                try:
+                    pending = frames.get_nowait()
+                except queue.Empty:
+                    continue
+                if pending is None:
+                    continue
+                    
+                fmt, width, height = header.unpack_from(pending)[:3]
+                if fmt == protocol_utils.SCREEN_UNCHANGED:
+                    continue
+                if data is not None and header.unpack_from(data)[0] == protocol_utils.SCREEN_UNCHANGED:
+                    # The client counts the pending picture as shown, so it must
+                    # not be lost - keep its pixels and take the new cursor
+                    cursor_x, cursor_y = header.unpack_from(data)[3:]
+                    header.pack_into(pending, 0, fmt, width, height, cursor_x, cursor_y)
+                    data = pending
+                elif fmt in (protocol_utils.SCREEN_RAW_RGB, protocol_utils.SCREEN_RAW_BGRA):
+                    try:
+                        spares.put_nowait(pending)  # Dropped unseen - its buffer can be reused
+                    except queue.Full:
+                        pass
+                    
+    def _decode_screenshots(self, frames, spares):
+        """Decode queued screenshots and hand them to the Tk thread for display."""
+        source = None  # Last picture received, before scaling
+        last_size = None  # Size it was last shown at
+        
+        while True:
+            data = frames.get()
+            if data is None:
+                break
+                
+            try:
+                # Extract pixel format, size and cursor position
+                fmt, width, height, self.cursor_x, self.cursor_y = \
+                    protocol_utils.SCREEN_HEADER.unpack_from(data)
+                pixels = memoryview(data)[protocol_utils.SCREEN_HEADER.size:]
+                
+                # Fit the remote screen to the size <Configure> last reported,
+                # so this thread never has to query Tk. Screens that already
+                # fit are drawn 1:1, so clicks map back unscaled
+                canvas_width, canvas_height = self._target_size
+                scale = 1.0
+                if canvas_width > 1 and canvas_height > 1:
+                    scale = min(canvas_width / width, canvas_height / height, 1.0)
+                shown_size = (int(width * scale), int(height * scale))
+                
+                # A static remote screen sends no pixels; then only the cursor
+                # needs updating, unless the canvas was resized since
+                if fmt == protocol_utils.SCREEN_UNCHANGED:
+                    image = source if shown_size != last_size else None
+                    
+                # Convert image - raw frames need no decoder, only the
+                # compressed fallback goes through Image.open
+                elif fmt == protocol_utils.SCREEN_RAW_RGB:
+                    image = source = Image.frombuffer('RGB', (width, height), pixels, 'raw', 'RGB', 0, 1)
+                elif fmt == protocol_utils.SCREEN_RAW_BGRA:
+                    image = source = Image.frombuffer('RGB', (width, height), pixels, 'raw', 'BGRX', 0, 1)
+                else:
+                    image = source = Image.open(io.BytesIO(pixels))
+                    if scale < 1:
+                        # Let the JPEG decoder scale by 1/2, 1/4 or 1/8 as it decodes
+                        image.draft('RGB', shown_size)
+                    image.load()
+                pixels.release()
+                
+                # PIL keeps RGB as 4-byte pixels, so frombuffer unpacked a copy and
+                # the buffer is free; raw frames keep one size, so it gets reused
+                if fmt in (protocol_utils.SCREEN_RAW_RGB, protocol_utils.SCREEN_RAW_BGRA):
+                    try:
+                        spares.put_nowait(data)
+                    except queue.Full:
+                        pass
+                        
+                # Shrink with Pillow before Tk ever sees the frame; the scale is
+                # against the remote screen size, whatever draft left behind
+                if image is not None and image.size != shown_size:
+                    image = image.resize(shown_size, RESIZE_FILTER)
+                self.scale_factor_x = scale
+                self.scale_factor_y = scale
+                last_size = shown_size
+                
+                # Only schedule a blit if none is pending; a pending one
+                # will pick up this frame instead of the one it was queued for
+                with self._frame_lock:
+                    scheduled = self._next_frame is not None
+                    if image is None and scheduled:
+                        image = self._next_frame[0]  # Don't lose a picture not yet shown
+                    self._next_frame = (image, self.cursor_x, self.cursor_y, scale)
+                if not scheduled:
+                    self.root.after(0, self._blit)
+                
+            except Exception as e:
+                self.log(f"Error decoding screenshot: {str(e)}")
+                
+    def _blit(self):
+        """Show the latest decoded screenshot (runs on the Tk thread)."""
+        with self._frame_lock:
+            frame, self._next_frame = self._next_frame, None
+        if frame is None or not self.control_connected or self._img_item is None:
+            return  # A late frame must not repaint a closed session
+            
+        image, cursor_x, cursor_y, scale = frame
+        
+        # Update mouse position
+        self._set_label(self.mouse_pos_label, f"({cursor_x}, {cursor_y})")
+        
+        # Display image - PhotoImage belongs to Tk, so it lives on this thread.
+        # Same-size frames are pasted into it; a new one is made on resize
+        photo = self._photo
+        if image is None:
+            pass  # Unchanged picture, only the cursor moved
+        elif photo is not None and (photo.width(), photo.height()) == image.size:
+            photo.paste(image)
+        else:
+            photo = ImageTk.PhotoImage(image)
+            self.canvas.itemconfig(self._img_item, image=photo)
+            self._photo = photo  # Keep a reference so Tk doesn't lose the image
+        
+        # Move the crosshair over the remote cursor
+        x, y = int(cursor_x * scale), int(cursor_y * scale)
+        horizontal, vertical = self._cursor_items
+        self.canvas.coords(horizontal, x - CURSOR_SIZE, y, x + CURSOR_SIZE, y)
+        self.canvas.coords(vertical, x, y - CURSOR_SIZE, x, y + CURSOR_SIZE)
+        
+    def _recv_all(self, n, buffer=None):
+        """Receive exactly n bytes, into buffer if it is that size."""
+        # Read straight into one buffer of the final size rather than
+        # gluing together the chunks each recv returns
+        data = buffer if buffer is not None and len(buffer) == n else bytearray(n)
+        try:
+            if not protocol_utils.recv_exact(self.control_socket, memoryview(data)):
                 return None
+        except socket.timeout:
+            return None
+        except ConnectionError:
+            return None
         return data
         
     def send_command(self, command):
-        """Send a command to the connected client with improved error handling."""
-        if not self.control_connected or not self.control_socket:
-            return False
-            
-        try:
-            command_data = pickle.dumps(command)
-            
-            # Set a shorter timeout for sending commands
-            original_timeout = self.control_socket.gettimeout()
-            self.control_socket.settimeout(10.0)
-            
-            self.control_socket.sendall(command_data)
-            
-            # Restore original timeout
-            self.control_socket.settimeout(original_timeout)
-            
-            return True
-            
-        except socket.timeout:
-            self.log("Command send timeout")
-            return False
-        except ConnectionError as e:
-            if self.control_connected:
-                self.log(f"Connection lost while sending command")
-                threading.Timer(2.0, self.disconnect_from_client).start()
-            return False
-        except Exception as e:
-            if self.control_connected:
-                self.log(f"Error sending command: {str(e)}")
-                threading.Timer(2.0, self.disconnect_from_client).start()
+        """Queue a command for the connected client, False if there is none."""
+        # Length-prefixed like the mediator channel, so commands sent
+        # back to back can't run together on the client's side
+        return self._send_command_frame(protocol_utils.encode_message(command))
+        
+    def _send_command_frame(self, frame):
+        """Queue an already encoded command, False if no client is connected."""
+        commands = self._commands
+        if not self.control_connected or commands is None:
             return False
-            
+        commands.put(frame)
+        return True
+        
+    def _send_commands(self, sock, commands):
+        """Write queued commands to the client until the session ends."""
+        while True:
+            # Take whatever else queued up while the last write was in flight
+            batch = [commands.get()]
+            while True:
+                try:
+                    batch.append(commands.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                break  # Session ended
+                
+            try:
+                # The socket timeout is set once in connect_to_client
+                sock.sendall(b''.join(batch))
+            except Exception as e:
+                if self.control_socket is sock:
+                    if isinstance(e, socket.timeout):
+                        self.log("Command send timeout")
+                    else:
+                        self.log(f"Error sending command: {str(e)}")
+                    self.root.after(0, self.disconnect_from_client)
+                break
+                
     def disconnect_from_client(self):
         """Disconnect from the current client."""
         self.control_running = False
         self.control_connected = False
         
+        if self._commands is not None:
+            self._commands.put(None)  # Stop the command writer
+            self._commands = None
+            
         if self.control_socket:
+            try:
+                # Wake the receive loop now rather than at its next timeout
+                self.control_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
             try:
                 self.control_socket.close()
             except:
@@ -1006,7 +1307,7 @@ class RemoteControlTechnicianWithMediator:
                     'type': 'end_session',
                     'session_id': self.current_session_id
                 }
-                self.mediator_socket.send(json.dumps(end_session_msg).encode('utf-8'))
+                self._send_to_mediator(end_session_msg)
             except:
                 pass
                 
@@ -1023,6 +1324,10 @@ class RemoteControlTechnicianWithMediator:
             
 
             
+    def on_canvas_configure(self, event):
+        """Remember the canvas size for scaling incoming frames."""
+        self._target_size = (event.width, event.height)
+        
     def on_canvas_click(self, event):
         """Handle left mouse clicks."""
         if not self.control_connected:
@@ -1031,12 +1336,7 @@ class RemoteControlTechnicianWithMediator:
         remote_x = int(event.x / self.scale_factor_x)
         remote_y = int(event.y / self.scale_factor_y)
         
-        self.send_command({
-            'type': 'mouse_click',
-            'x': remote_x,
-            'y': remote_y,
-            'button': 'left'
-        })
+        self._send_command_frame(protocol_utils.frame_payload(LEFT_CLICK_FORMAT % (remote_x, remote_y)))
         
     def on_canvas_right_click(self, event):
         """Handle right mouse clicks."""
@@ -1046,36 +1346,29 @@ class RemoteControlTechnicianWithMediator:
         remote_x = int(event.x / self.scale_factor_x)
         remote_y = int(event.y / self.scale_factor_y)
         
-        self.send_command({
-            'type': 'mouse_click',
-            'x': remote_x,
-            'y': remote_y,
-            'button': 'right'
-        })
+        self._send_command_frame(protocol_utils.frame_payload(RIGHT_CLICK_FORMAT % (remote_x, remote_y)))
         
     def on_canvas_motion(self, event):
-        """Handle mouse movement with throttling."""
+        """Handle mouse movement; only the latest position is sent."""
         if not self.control_connected:
             return
+            
+        self._pending_mouse = (int(event.x / self.scale_factor_x),
+                               int(event.y / self.scale_factor_y))
         
-        # ADD THROTTLING - only send mouse move every 50ms
-        current_time = time.time()
-        if not hasattr(self, '_last_mouse_move_time'):
-            self._last_mouse_move_time = 0
-        
-        if current_time - self._last_mouse_move_time < 0.05:  # 50ms throttle
+        if not self._mouse_flush_scheduled:
+            self._mouse_flush_scheduled = True
+            self.root.after(MOUSE_MOVE_INTERVAL, self._flush_mouse)
+            
+    def _flush_mouse(self):
+        """Send the pending mouse position if it changed since the last send."""
+        self._mouse_flush_scheduled = False
+        position, self._pending_mouse = self._pending_mouse, None
+        if position is None or position == self._last_sent_mouse or not self.control_connected:
             return
-        
-        self._last_mouse_move_time = current_time
-        
-        remote_x = int(event.x / self.scale_factor_x)
-        remote_y = int(event.y / self.scale_factor_y)
-        
-        self.send_command({
-            'type': 'mouse_move',
-            'x': remote_x,
-            'y': remote_y
-        })
+            
+        self._last_sent_mouse = position
+        self._send_command_frame(protocol_utils.frame_payload(MOUSE_MOVE_FORMAT % position))
         
 
             
@@ -1084,48 +1377,21 @@ class RemoteControlTechnicianWithMediator:
         if not self.keyboard_focus or not self.control_connected:
             return
             
-        # Handle special keys
-        key_map = {
-            'Return': 'enter',
-            'Tab': 'tab',
-            'BackSpace': 'backspace',
-            'Delete': 'delete',
-            'Escape': 'escape',
-            'space': 'space',
-            'Up': 'up',
-            'Down': 'down',
-            'Left': 'left',
-            'Right': 'right',
-            'Home': 'home',
-            'End': 'end',
-            'Page_Up': 'pageup',
-            'Page_Down': 'pagedown',
-            'F1': 'f1', 'F2': 'f2', 'F3': 'f3', 'F4': 'f4',
-            'F5': 'f5', 'F6': 'f6', 'F7': 'f7', 'F8': 'f8',
-            'F9': 'f9', 'F10': 'f10', 'F11': 'f11', 'F12': 'f12'
-        }
-        
-        # Get the key to send
-        if event.keysym in key_map:
-            key_to_send = key_map[event.keysym]
-        elif event.char and event.char.isprintable():
-            key_to_send = event.char
-        elif event.keysym.lower() in ['control_l', 'control_r']:
-            key_to_send = 'ctrl'
-        elif event.keysym.lower() in ['alt_l', 'alt_r']:
-            key_to_send = 'alt'
-        elif event.keysym.lower() in ['shift_l', 'shift_r']:
-            key_to_send = 'shift'
-        elif event.keysym.lower() in ['super_l', 'super_r', 'win_l', 'win_r']:
-            key_to_send = 'win'
-        else:
-            key_to_send = event.keysym.lower()
+        # Get the key to send: special keys, then printable characters,
+        # then modifiers and anything else by lowercased keysym
+        key_to_send = KEY_MAP.get(event.keysym)
+        if key_to_send is None:
+            if event.char and event.char.isprintable():
+                key_to_send = event.char
+            else:
+                keysym = event.keysym.lower()
+                key_to_send = KEY_MAP.get(keysym, keysym)
         
         if key_to_send:
-            success = self.send_command({
+            self._send_command_frame(protocol_utils.encode_template(KEY_PRESS_TEMPLATE, {
                 'type': 'key_press',
                 'key': key_to_send
-            })
+            }))
 
     def on_key_release(self, event):
         """Handle key release events."""
@@ -1145,6 +1411,7 @@ class RemoteControlTechnicianWithMediator:
         """Handle window close."""
         self.disconnect_from_client()
         self.disconnect_from_mediator()
+        self._pool.shutdown(wait=False, cancel_futures=True)
         self.root.destroy()
         
     def run(self):